@@ -0,0 +1,75 @@
+"""Contacts list serialization: response_model path against the fast JSON path
+
+    python -m benchmarks.contacts_json
+
+Pure CPU, no database: rows are built in memory with the columns the
+repository selects. The response_model path validates the rows into
+ContactsResponse, encodes them with jsonable_encoder and renders a
+JSONResponse, as FastAPI does. The fast path (CONTACTS_FAST_JSON) dumps the
+rows to bytes at once with the ContactsRow TypeAdapter.
+"""
+
+import timeit
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.repositories.contacts import CONTACT_COLUMNS
+from src.schemas.contacts import ContactsResponse, contacts_rows_json
+
+SIZES = (10, 100, 500)
+
+Row = namedtuple("Row", [column.key for column in CONTACT_COLUMNS])
+response_model = TypeAdapter(list[ContactsResponse])
+
+
+def make_rows(count: int) -> list[Row]:
+    now = datetime(2025, 1, 1, 12, 0)
+    return [
+        Row(
+            id=i,
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            email=f"contact{i}@example.com",
+            phone=380500000000 + i if i % 2 else None,
+            birth_date=date(1990, 1, 1) + timedelta(days=i),
+            description="Met at the conference, likes hiking" if i % 3 else None,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def response_model_path(rows: list[Row]) -> bytes:
+    contacts = response_model.validate_python(rows, from_attributes=True)
+    return JSONResponse(jsonable_encoder(contacts)).body
+
+
+def fast_path(rows: list[Row]) -> bytes:
+    return contacts_rows_json.dump_json([row._asdict() for row in rows])
+
+
+def best_of(func, rows: list[Row], number: int) -> float:
+    """Best time of one call in seconds"""
+    return min(timeit.repeat(lambda: func(rows), number=number, repeat=5)) / number
+
+
+def main():
+    print(f"{'rows':>6} {'response_model':>16} {'fast':>10} {'speedup':>8}")
+    for size in SIZES:
+        rows = make_rows(size)
+        number = max(10, 5000 // size)
+        slow = best_of(response_model_path, rows, number)
+        fast = best_of(fast_path, rows, number)
+        print(
+            f"{size:>6} {slow * 1e6:>13.0f} us {fast * 1e6:>7.0f} us"
+            f" {slow / fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
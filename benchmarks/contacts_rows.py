@@ -0,0 +1,123 @@
+"""Contacts page loading: ORM entities with the user join against column rows
+
+    python -m benchmarks.contacts_rows
+
+Compares, at 10, 100 and 500 rows per page, the time and peak memory of
+- select(Contact) with the owner joined, as lazy="joined" used to load it,
+- select(Contact) without the join,
+- select(*CONTACT_COLUMNS), the rows the repository reads now.
+
+It runs on an in-memory SQLite copy of the tables, so no server is needed
+and the numbers show the client side (hydration, identity map) only; on
+Postgres the join also costs server time and bytes on the wire.
+"""
+
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Column, MetaData, Table, create_engine, insert, select
+from sqlalchemy.orm import Session, joinedload
+
+from src.entity.models import Contact, User
+from src.repositories.contacts import CONTACT_COLUMNS
+
+SIZES = (10, 100, 500)
+REPEAT = 20
+
+
+def plain_copy(table: Table, metadata: MetaData) -> Table:
+    """Same columns without server side generated values and Postgres types"""
+    return Table(
+        table.name,
+        metadata,
+        *(
+            Column(column.name, column.type, primary_key=column.primary_key)
+            for column in table.columns
+            if column.key not in ("search_text", "search_vector")
+        ),
+    )
+
+
+def seed(engine, count: int) -> None:
+    metadata = MetaData()
+    users = plain_copy(User.__table__, metadata)
+    contacts = plain_copy(Contact.__table__, metadata)
+    metadata.create_all(engine)
+    now = datetime(2025, 1, 1, 12, 0)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(users),
+            {
+                "id": 1,
+                "username": "owner",
+                "email": "owner@example.com",
+                "email_confirmed": True,
+                "password": "x" * 60,
+                "role": "REGULAR",
+                "avatar": "https://example.com/avatar.png",
+                "created_at": now,
+            },
+        )
+        birth_date = date(1990, 1, 1)
+        connection.execute(
+            insert(contacts),
+            [
+                {
+                    "id": i,
+                    "first_name": f"First{i}",
+                    "last_name": f"Last{i}",
+                    "email": f"contact{i}@example.com",
+                    "phone": 380500000000 + i,
+                    "birth_date": birth_date + timedelta(days=i),
+                    "birthday_key": 101,
+                    "description": "Met at the conference, likes hiking",
+                    "created_at": now,
+                    "updated_at": now,
+                    "user_id": 1,
+                }
+                for i in range(1, count + 1)
+            ],
+        )
+
+
+QUERIES = {
+    "entities + user join": lambda: select(Contact).options(joinedload(Contact.user)),
+    "entities": lambda: select(Contact),
+    "column rows": lambda: select(*CONTACT_COLUMNS),
+}
+
+
+def measure(engine, stmt, size: int) -> tuple[float, int]:
+    """Best seconds and peak bytes of loading one page in a fresh session"""
+    stmt = stmt.where(Contact.user_id == 1).order_by(Contact.id).limit(size)
+    best = float("inf")
+    for _ in range(REPEAT):
+        with Session(engine) as session:
+            started = time.perf_counter()
+            page = session.execute(stmt).unique().all()
+            best = min(best, time.perf_counter() - started)
+            del page
+    with Session(engine) as session:
+        tracemalloc.start()
+        page = session.execute(stmt).unique().all()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del page
+    return best, peak
+
+
+def main():
+    engine = create_engine("sqlite://")
+    seed(engine, max(SIZES))
+    print(f"{'rows':>6} {'query':<22} {'time':>10} {'peak memory':>13}")
+    for size in SIZES:
+        for name, query in QUERIES.items():
+            seconds, peak = measure(engine, query(), size)
+            print(
+                f"{size:>6} {name:<22} {seconds * 1e3:>7.2f} ms {peak / 1024:>10.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Revoked token checks: local bloom filter miss against a Redis EXISTS
+
+    python -m benchmarks.token_blacklist
+
+No Redis needed: the client is a stub whose EXISTS answers on the next loop
+iteration, so "per call" is the cost of TokenBlacklist.is_revoked on its own.
+"with round trip" adds ROUND_TRIP, a typical one within a data center, to
+the checks that ask Redis (sleeping that long would measure the timer).
+Compares a token missing from a filter loaded with CAPACITY ids, which
+answers without Redis, with a token found in the filter (revoked or a false
+positive) and with any token before the filter is synced, both of which
+ask Redis.
+"""
+
+import asyncio
+import time
+import uuid
+
+from src.services.token_blacklist import KEY_PREFIX, TokenBlacklist
+
+CAPACITY = 100_000
+ERROR_RATE = 0.001
+ROUND_TRIP = 0.0002
+NUMBER = 2000
+
+
+class StubRedis:
+    def __init__(self, keys: set[str]):
+        self.keys = keys
+
+    async def exists(self, key: str) -> int:
+        await asyncio.sleep(0)
+        return int(key in self.keys)
+
+
+class StubBlacklist(TokenBlacklist):
+    def __init__(self, revoked: list[str], synced: bool):
+        super().__init__(CAPACITY, ERROR_RATE, rebuild_seconds=600)
+        for token_id in revoked:
+            self._filter.add(token_id)
+        self._synced = synced
+        self._redis = StubRedis({f"{KEY_PREFIX}{token_id}" for token_id in revoked})
+
+    @property
+    def redis(self):
+        return self._redis
+
+
+async def per_call(blacklist: TokenBlacklist, token_id: str) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(NUMBER):
+            await blacklist.is_revoked(token_id)
+        best = min(best, (time.perf_counter() - started) / NUMBER)
+    return best
+
+
+async def run():
+    revoked = [str(uuid.uuid4()) for _ in range(CAPACITY)]
+    valid = str(uuid.uuid4())
+    synced = StubBlacklist(revoked, synced=True)
+    cases = {
+        "bloom miss": (synced, valid, 0),
+        "bloom hit, EXISTS": (synced, revoked[0], 1),
+        "not synced, EXISTS": (StubBlacklist(revoked, synced=False), valid, 1),
+    }
+    print(f"{'case':<20} {'per call':>10} {'with round trip':>16}")
+    for name, (blacklist, token_id, round_trips) in cases.items():
+        seconds = await per_call(blacklist, token_id)
+        total = seconds + round_trips * ROUND_TRIP
+        print(f"{name:<20} {seconds * 1e6:>7.1f} us {total * 1e6:>13.1f} us")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Upcoming birthdays query plans and timings on Postgres
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.upcoming_birthdays
+
+Compares, for a window inside the year and one over the year end, at the
+first and a later page,
+- the key range query the repository runs inside the year,
+- OR of the two key ranges over the year end, as the repository used to run,
+- UNION ALL of the two ranges, each read in index order up to the page end,
+  the query the repository runs now.
+
+The contacts of a throwaway user are inserted in a transaction that is
+rolled back at the end, so any migrated database will do.
+"""
+
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import insert, or_, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.conf.config import settings
+from src.entity.models import Contact, User
+from src.repositories.contacts import (
+    CONTACT_COLUMNS,
+    ContactsRepository,
+    birthday_window,
+)
+
+CONTACTS = 100_000
+PAGE = 20
+OFFSETS = (0, 2000)
+REPEAT = 20
+WINDOWS = {
+    "in year": (date(2025, 6, 1), date(2025, 7, 1)),
+    "year end": (date(2025, 12, 15), date(2026, 1, 14)),
+}
+
+
+def or_stmt(user_id: int, start_date: date, end_date: date, offset: int):
+    """The wrap case as it was, one OR filter sorted as a whole"""
+    start_key, end_key = birthday_window(start_date, end_date)
+    return (
+        select(*CONTACT_COLUMNS)
+        .where(Contact.user_id == user_id)
+        .filter(or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key))
+        .order_by(Contact.birthday_key < start_key, Contact.birthday_key, Contact.id)
+        .limit(PAGE)
+        .offset(offset)
+    )
+
+
+async def seed(connection) -> int:
+    user_id = await connection.scalar(
+        insert(User)
+        .values(
+            username="birthdays-benchmark",
+            email="birthdays-benchmark@example.com",
+            password="x" * 60,
+        )
+        .returning(User.id)
+    )
+    # birth dates spread over every day of the year
+    await connection.execute(
+        text(
+            "INSERT INTO contacts (first_name, last_name, email, birth_date,"
+            " created_at, updated_at, user_id)"
+            " SELECT 'First' || i, 'Last' || i, 'contact' || i || '@example.com',"
+            " date '1990-01-01' + (i * 7919 % 365), now(), now(), :user_id"
+            " FROM generate_series(1, :count) AS i"
+        ),
+        {"user_id": user_id, "count": CONTACTS},
+    )
+    await connection.execute(text("ANALYZE contacts"))
+    return user_id
+
+
+async def measure(connection, stmt) -> tuple[float, str]:
+    """Best seconds of the query and its EXPLAIN ANALYZE plan"""
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        (await connection.execute(stmt)).all()
+        best = min(best, time.perf_counter() - started)
+    compiled = stmt.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}")
+    return best, "\n".join(line for (line,) in plan)
+
+
+async def run():
+    engine = create_async_engine(settings.DB_URL)
+    results = []
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            user_id = await seed(connection)
+            # the statement builder needs the user id only
+            repository = ContactsRepository(None, User(id=user_id))
+            for window, (start_date, end_date) in WINDOWS.items():
+                for offset in OFFSETS:
+                    queries = {
+                        "repository": repository._get_upcoming_birthday_stmt(
+                            start_date, end_date, PAGE, offset
+                        )
+                    }
+                    if start_date.year != end_date.year:
+                        queries["or"] = or_stmt(user_id, start_date, end_date, offset)
+                    for name, stmt in queries.items():
+                        seconds, plan = await measure(connection, stmt)
+                        results.append((window, offset, name, seconds, plan))
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    for window, offset, name, _, plan in results:
+        print(f"--- {window}, offset {offset}, {name}")
+        print(plan)
+        print()
+    print(f"{'window':<10} {'offset':>7} {'query':<12} {'time':>10}")
+    for window, offset, name, seconds, _ in results:
+        print(f"{window:<10} {offset:>7} {name:<12} {seconds * 1e3:>7.2f} ms")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
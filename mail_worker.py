@@ -0,0 +1,30 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from src.conf.config import settings
+from src.database.redis import redis_manager
+from src.services.mail_queue import MailWorker
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def main():
+    worker = MailWorker(consumer=f"{socket.gethostname()}-{os.getpid()}")
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await redis_manager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.DEBUG if settings.ENV == "dev" else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    asyncio.run(main())
@@ -1,16 +1,53 @@
 import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.database.redis import redis_manager
 from src.routes import internal
 from src.routes.v1 import contacts, auth, users
+from src.services.passwords import password_hasher
+from src.services.rate_limiter import rate_limiter
+from src.services.token_blacklist import token_blacklist
+from src.utils.timing import TimingMiddleware, timing_metrics
 
 logger = logging.getLogger("uvicorn.error")
 logger.setLevel(logging.DEBUG if settings.ENV == "dev" else logging.INFO)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn accepts connections only once the startup is complete
+    try:
+        await sessionmanager.warm_up(settings.WARMUP_DB_CONNECTIONS)
+        await redis_manager.warm_up(settings.WARMUP_REDIS_CONNECTIONS)
+    except Exception as e:
+        logger.warning(f"Pools warm-up failed: {e}")
+    try:
+        await rate_limiter.load()
+    except Exception as e:
+        logger.warning(f"Rate limiter script load failed: {e}")
+    token_blacklist.start()
+    timing_metrics.start()
+    yield
+    # on SIGTERM this runs after in-flight requests are drained
+    await timing_metrics.stop()
+    await token_blacklist.stop()
+    password_hasher.shutdown()
+    await redis_manager.close()
+    await sessionmanager.close()
+
+
 app = FastAPI(
-    title="Users Contacts Organizer", version="1.3", description="GoIT Home Work 10"
+    title="Users Contacts Organizer",
+    version="1.3",
+    description="GoIT Home Work 10",
+    lifespan=lifespan,
 )
 logger.debug(
     "Starting FastAPI app '%s' v%s in environment '%s'",
@@ -19,12 +56,16 @@ logger.debug(
     settings.ENV,
 )
 
+# added first, so it is the innermost one and doesn't time CORS preflights
+app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_HEADER)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.LIMIT_ORIGINS],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # cursor paging of contacts lists and search
+    expose_headers=[contacts.NEXT_CURSOR_HEADER],
 )
 
 v1_router = APIRouter(prefix="/api/v1")
@@ -35,12 +76,26 @@ v1_router.include_router(contacts.router)
 app.include_router(v1_router)
 app.include_router(internal.router)
 
+if settings.AVATAR_STORAGE == "local":
+    # LocalStorage avatar URLs point here
+    app.mount(
+        settings.AVATAR_LOCAL_URL,
+        StaticFiles(directory=settings.AVATAR_LOCAL_DIR, check_dir=False),
+        name="avatars",
+    )
+
 if __name__ == "__main__":
     import uvicorn
 
+    dev = settings.ENV == "dev"
     uvicorn.run(
         "main:app",
         host=settings.BIND_HOST,
         port=settings.BIND_PORT,
-        reload=True if settings.ENV == "dev" else False,
+        reload=dev,
+        workers=None if dev else settings.WORKERS or os.cpu_count(),
+        # uvloop and httptools when installed
+        loop="auto",
+        http="auto",
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
     )
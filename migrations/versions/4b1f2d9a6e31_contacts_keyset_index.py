@@ -0,0 +1,28 @@
+"""Contacts keyset pagination index
+
+Revision ID: 4b1f2d9a6e31
+Revises: c7e0d5f84d70
+Create Date: 2026-10-18 10:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1f2d9a6e31'
+down_revision: Union[str, None] = 'c7e0d5f84d70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('Contacts_user_id_id_idx', 'contacts', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('Contacts_user_id_id_idx', table_name='contacts')
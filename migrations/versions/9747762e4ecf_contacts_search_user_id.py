@@ -0,0 +1,36 @@
+"""Contacts search indexes per user
+
+Revision ID: 9747762e4ecf
+Revises: e51a0c8b7d42
+Create Date: 2026-10-18 19:52:17.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9747762e4ecf'
+down_revision: Union[str, None] = 'e51a0c8b7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin puts user_id into the GIN indexes, searches stay in one tenant
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.drop_index('Contacts_search_vector_idx', table_name='contacts', postgresql_using='gin')
+    op.drop_index('Contacts_search_text_trgm_idx', table_name='contacts', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('Contacts_user_id_search_text_trgm_idx', 'contacts', ['user_id', 'search_text'], unique=False, postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('Contacts_user_id_search_vector_idx', 'contacts', ['user_id', 'search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('Contacts_user_id_search_vector_idx', table_name='contacts', postgresql_using='gin')
+    op.drop_index('Contacts_user_id_search_text_trgm_idx', table_name='contacts', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('Contacts_search_text_trgm_idx', 'contacts', ['search_text'], unique=False, postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('Contacts_search_vector_idx', 'contacts', ['search_vector'], unique=False, postgresql_using='gin')
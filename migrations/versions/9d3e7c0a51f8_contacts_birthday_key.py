@@ -0,0 +1,40 @@
+"""Contacts birthday key
+
+Revision ID: 9d3e7c0a51f8
+Revises: 4b1f2d9a6e31
+Create Date: 2026-10-18 11:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e7c0a51f8'
+down_revision: Union[str, None] = '4b1f2d9a6e31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # stored generated column, Postgres backfills existing rows on ADD COLUMN
+    op.add_column('contacts', sa.Column(
+        'birthday_key',
+        sa.SmallInteger(),
+        sa.Computed(
+            "(EXTRACT(MONTH FROM birth_date) * 100"
+            " + EXTRACT(DAY FROM birth_date))::smallint",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('Contacts_user_id_birthday_key_idx', 'contacts', ['user_id', 'birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('Contacts_user_id_birthday_key_idx', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,51 @@
+"""Contacts search columns
+
+Revision ID: e51a0c8b7d42
+Revises: 9d3e7c0a51f8
+Create Date: 2026-10-18 15:41:09.552730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e51a0c8b7d42'
+down_revision: Union[str, None] = '9d3e7c0a51f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = (
+    "first_name || ' ' || last_name || ' ' || coalesce(email, '')"
+    " || ' ' || coalesce(phone::text, '') || ' ' || coalesce(description, '')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('contacts', sa.Column(
+        'search_text',
+        sa.String(),
+        sa.Computed(f"lower({SEARCH_DOCUMENT})", persisted=True),
+        nullable=True,
+    ))
+    op.add_column('contacts', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(f"to_tsvector('simple', {SEARCH_DOCUMENT})", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('Contacts_search_text_trgm_idx', 'contacts', ['search_text'], unique=False, postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('Contacts_search_vector_idx', 'contacts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('Contacts_search_vector_idx', table_name='contacts', postgresql_using='gin')
+    op.drop_index('Contacts_search_text_trgm_idx', table_name='contacts', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.drop_column('contacts', 'search_vector')
+    op.drop_column('contacts', 'search_text')
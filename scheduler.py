@@ -0,0 +1,33 @@
+import asyncio
+import logging
+import signal
+
+from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.database.redis import redis_manager
+from src.services.birthdays import rebuild_birthday_digests
+from src.services.scheduler import Scheduler
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def main():
+    scheduler = Scheduler()
+    if settings.BIRTHDAYS_DIGEST_ENABLED:
+        scheduler.daily(settings.BIRTHDAYS_DIGEST_AT, rebuild_birthday_digests)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    try:
+        await scheduler.run()
+    finally:
+        await sessionmanager.close()
+        await redis_manager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.DEBUG if settings.ENV == "dev" else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    asyncio.run(main())
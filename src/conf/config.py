@@ -1,3 +1,5 @@
+from datetime import time
+
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict, EmailStr
 
@@ -6,24 +8,90 @@ class Settings(BaseSettings):
     BIND_HOST: str = "localhost"
     BIND_PORT: int = 8000
     ENV: str = "dev"
+    # 0 starts a worker per CPU, ignored in dev where the server reloads
+    WORKERS: int = 0
+    # in-flight requests get this long to finish on SIGTERM
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # connections of each pool opened before serving
+    WARMUP_DB_CONNECTIONS: int = 2
+    WARMUP_REDIS_CONNECTIONS: int = 2
+    # stage times of each response in the Server-Timing header
+    SERVER_TIMING_HEADER: bool = True
+    # workers add their stage histograms to the totals in Redis this often
+    METRICS_FLUSH_SECONDS: float = 5
 
     # SQL DB
     DB_URL: str = ""
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # 0 leaves the server default (no timeout)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # comma separated URLs of read replicas
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: float = 30
 
     # redis
     REDIS_URL: str = "redis://localhost"
+    REDIS_MAX_CONNECTIONS: int = 50
+    # seconds to wait for a free connection when the pool is exhausted
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_SOCKET_TIMEOUT: float = 2
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    # authenticated users cache
+    USER_CACHE_TTL_SECONDS: int = 300
+    # in-process tier is not invalidated across workers, so keep it short
+    USER_CACHE_LOCAL_TTL_SECONDS: float = 5.0
+    USER_CACHE_LOCAL_MAXSIZE: int = 1024
+
+    # contacts
+    CONTACTS_IMPORT_BATCH_SIZE: int = 1000
+    CONTACTS_IMPORT_MAX_ERRORS: int = 1000
+    CONTACTS_EXPORT_CHUNK_SIZE: int = 1000
+    # serialize contacts lists straight from DB rows to JSON bytes
+    CONTACTS_FAST_JSON: bool = False
+    # per-user cache of list/birthdays responses, always served as fast JSON
+    CONTACTS_CACHE_ENABLED: bool = True
+    CONTACTS_CACHE_TTL_SECONDS: int = 300
+    CONTACTS_CACHE_LOCAL_TTL_SECONDS: float = 30
+    CONTACTS_CACHE_LOCAL_MAXSIZE: int = 1024
+    # upcoming birthdays precomputed in Redis once a day by scheduler.py
+    BIRTHDAYS_DIGEST_ENABLED: bool = True
+    BIRTHDAYS_DIGEST_AT: time = time(0, 0, 5)
+    BIRTHDAYS_DIGEST_TTL_SECONDS: int = 2 * 24 * 3600
+
+    # passwords hashing, executor is "thread" or "process"
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_BCRYPT_ROUNDS: int = 12
 
     # jwt
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     EMAIL_TOKEN_EXPIRE_DAYS: int = 7
+    EMAIL_TOKEN_REUSE_MARGIN_HOURS: int = 24
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str = "HS256"
     SECRET_KEY: str = "secret"
 
+    # revoked tokens local bloom filter
+    BLACKLIST_BLOOM_CAPACITY: int = 100_000
+    BLACKLIST_BLOOM_ERROR_RATE: float = 0.001
+    BLACKLIST_REBUILD_SECONDS: float = 600
+
     # limits
     LIMIT_ORIGINS: str = "*"
     LIMIT4_USERS_ME: str = "5/minute"
     LIMIT4_USERS_RESENT: str = "3/day"
+    # Redis slower than this is skipped for a while, limits are then per worker
+    RATE_LIMIT_REDIS_TIMEOUT: float = 0.001
+    RATE_LIMIT_REDIS_RETRY_SECONDS: float = 1
+    RATE_LIMIT_LOCAL_MAXSIZE: int = 10_000
 
     # mail by meta.ua
     MAIL_USERNAME: EmailStr = "???@meta.ua"
@@ -36,6 +104,21 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = True
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_TIMEOUT: float = 30
+
+    # mail queue and worker
+    MAIL_QUEUE_MAXLEN: int = 100_000
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_SECONDS: float = 30
+    MAIL_RETRY_MAX_SECONDS: float = 3600
+    MAIL_CLAIM_IDLE_SECONDS: int = 300
+
+    # avatars, storage is "cloudinary" or "local"
+    AVATAR_STORAGE: str = "cloudinary"
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_LOCAL_DIR: str = "static/avatars"
+    AVATAR_LOCAL_URL: str = "/static/avatars"
 
     # Cloudinary
     CLOUDINARY_NAME: str
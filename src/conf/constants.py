@@ -4,3 +4,4 @@ DESCRIPTION_MAX_LENGTH = 1024
 DESCRIPTION_MIN_LENGTH = 5
 PASSWD_MIN_LENGTH=6
 PASSWD_MAX_LENGTH=18
+CONTACTS_BATCH_MAX_SIZE = 1000
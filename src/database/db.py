@@ -1,29 +1,242 @@
+import asyncio
 import contextlib
+import itertools
 import logging
+import time
 
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
+    AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.conf.config import settings
+from src.utils.metrics import Histogram
 
 logger = logging.getLogger("uvicorn.error")
 
+# bind_arguments of read-only statements which may be served by a replica
+REPLICA = {"replica": True}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.acquire_wait = Histogram()
+        self.connection_hold = Histogram()
+        self.session_lifetime = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool which measures how long checkouts wait for a connection"""
+
+    metrics: PoolMetrics | None = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.acquire_wait.observe(time.perf_counter() - started)
+
+
+def _engine_options(url: str) -> dict:
+    options = dict(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if make_url(url).get_driver_name() == "asyncpg":
+        server_settings = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        }
+    return options
+
+
+class ReplicaSet:
+    """Round-robin balancer over the healthy read replicas"""
+
+    def __init__(self, urls: list[str], retry_after: float):
+        self.engines = [
+            create_async_engine(url, **_engine_options(url)) for url in urls
+        ]
+        self.retry_after = retry_after
+        self._down_until = [0.0] * len(self.engines)
+        self._counter = itertools.count()
+        for index, engine in enumerate(self.engines):
+            self._watch(index, engine)
+
+    def _watch(self, index: int, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def on_error(context):
+            # connect failures come without a connection
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index)
+
+    def mark_down(self, index: int) -> None:
+        logger.warning(f"DB replica #{index} is down, reads fall back to primary")
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+    def pick(self) -> AsyncEngine | None:
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            if self._down_until[index] <= now:
+                return self.engines[index]
+        return None
+
+    async def check(self, timeout: float = 2) -> int:
+        """Probe every replica, returns how many are healthy"""
+
+        async def probe(index: int, engine: AsyncEngine) -> bool:
+            try:
+                async with engine.connect() as connection:
+                    await asyncio.wait_for(
+                        connection.execute(text("SELECT 1")), timeout=timeout
+                    )
+            except Exception as e:
+                logger.error(f"DB replica #{index} health check failed: {e}")
+                self.mark_down(index)
+                return False
+            self._down_until[index] = 0.0
+            return True
+
+        results = await asyncio.gather(
+            *(probe(index, engine) for index, engine in enumerate(self.engines))
+        )
+        return sum(results)
+
+
+class RoutingSession(Session):
+    """Sends statements executed with bind_arguments=REPLICA to a replica
+
+    Everything else goes to the primary, and once the session has written
+    anything all its reads go to the primary too (read-your-writes).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = kw.pop("replica", False)
+        replicas: ReplicaSet | None = self.info.get("replicas")
+        wrote = self._flushing or self.info.get("wrote")
+        if replica and replicas and not wrote:
+            engine = replicas.pick()
+            if engine is not None:
+                return engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
+    def __init__(self, url: str, replica_urls: list[str] = ()):
+        self._engine: AsyncEngine | None = create_async_engine(
+            url, **_engine_options(url)
+        )
+        self.replicas = (
+            ReplicaSet(replica_urls, settings.DB_REPLICA_RETRY_SECONDS)
+            if replica_urls
+            else None
+        )
         self._session_maker: async_sessionmaker = async_sessionmaker(
-            autoflush=False, autocommit=False, bind=self._engine
+            autoflush=False,
+            autocommit=False,
+            bind=self._engine,
+            sync_session_class=RoutingSession,
+            info={"replicas": self.replicas},
         )
+        self.metrics = PoolMetrics()
+        self._instrument(self._engine)
+
+    async def warm_up(self, connections: int) -> None:
+        """Open pool connections ahead of the first requests"""
+
+        async def connect(engine: AsyncEngine) -> None:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        engines = [self._engine, *(self.replicas.engines if self.replicas else ())]
+        # held at once, so every one of them is a separate connection
+        await asyncio.gather(
+            *(connect(engine) for engine in engines for _ in range(connections))
+        )
+
+    async def close(self) -> None:
+        await self._engine.dispose()
+        if self.replicas is not None:
+            for engine in self.replicas.engines:
+                await engine.dispose()
+
+    async def check_replicas(self) -> int | None:
+        if self.replicas is None:
+            return None
+        return await self.replicas.check()
+
+    def _instrument(self, engine: AsyncEngine) -> None:
+        engine.pool.metrics = self.metrics
+        metrics = self.metrics
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            metrics.checkouts += 1
+            connection_record.info["checkout_at"] = time.perf_counter()
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            checkout_at = connection_record.info.pop("checkout_at", None)
+            if checkout_at is not None:
+                metrics.connection_hold.observe(time.perf_counter() - checkout_at)
+
+    def stats(self) -> dict:
+        pool = self._engine.pool
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": self.metrics.checkouts,
+            "timeouts": self.metrics.timeouts,
+            "acquire_wait_seconds": self.metrics.acquire_wait.snapshot(),
+            "connection_hold_seconds": self.metrics.connection_hold.snapshot(),
+            "session_lifetime_seconds": self.metrics.session_lifetime.snapshot(),
+        }
 
     @contextlib.asynccontextmanager
     async def session(self):
         if self._session_maker is None:
             raise Exception("Database session is not initialized")
+        started = time.perf_counter()
         session = self._session_maker()
         try:
             yield session
@@ -37,12 +250,60 @@ class DatabaseSessionManager:
             raise
         finally:
             await session.close()
+            self.metrics.session_lifetime.observe(time.perf_counter() - started)
+
+
+class LazySession:
+    """Request scoped proxy of AsyncSession
+
+    The real session, and with it a pool connection, is opened on first use
+    only. release() gives it back early, e.g. before response serialization;
+    a later use transparently opens a new one.
+    """
 
+    def __init__(self, manager: DatabaseSessionManager):
+        self._manager = manager
+        self._session: AsyncSession | None = None
+        self._started = 0.0
+        self._wrote = False
 
-sessionmanager = DatabaseSessionManager(settings.DB_URL)
+    def _get_session(self) -> AsyncSession:
+        if self._session is None:
+            if self._manager._session_maker is None:
+                raise Exception("Database session is not initialized")
+            self._session = self._manager._session_maker()
+            # keep read-your-writes across release()
+            self._session.info["wrote"] = self._wrote
+            self._started = time.perf_counter()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._get_session(), name)
+
+    async def release(self) -> None:
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        self._wrote = session.info.get("wrote", False)
+        await session.close()
+        self._manager.metrics.session_lifetime.observe(
+            time.perf_counter() - self._started
+        )
+
+
+sessionmanager = DatabaseSessionManager(
+    settings.DB_URL,
+    [url.strip() for url in settings.DB_REPLICA_URLS.split(",") if url.strip()],
+)
 
 
 async def get_db():
-    logger.debug(f"DB_URL: {settings.DB_URL}")
-    async with sessionmanager.session() as session:
+    session = LazySession(sessionmanager)
+    try:
         yield session
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise
+    finally:
+        # close() rolls back any unfinished transaction
+        await session.release()
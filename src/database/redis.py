@@ -1,6 +1,58 @@
+import asyncio
+
 import redis.asyncio as redis
 from src.conf.config import settings
 
 
-def get_redis_client():
-    return redis.from_url(settings.REDIS_URL)
+class RedisClientManager:
+    """Process wide Redis client over one bounded connection pool"""
+
+    def __init__(self, url: str):
+        self._url = url
+        self._pool: redis.BlockingConnectionPool | None = None
+        self._client: redis.Redis | None = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._pool = redis.BlockingConnectionPool.from_url(
+                self._url,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            self._client = redis.Redis(connection_pool=self._pool)
+        return self._client
+
+    async def warm_up(self, connections: int) -> None:
+        """Open pool connections ahead of the first requests"""
+        await asyncio.gather(*(self.client.ping() for _ in range(connections)))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            await self._pool.disconnect()
+            self._client = None
+            self._pool = None
+
+    def stats(self) -> dict:
+        pool = self._pool
+        if pool is None:
+            return {"max_connections": settings.REDIS_MAX_CONNECTIONS, "created": 0}
+        available = len(pool._available_connections)
+        in_use = len(pool._in_use_connections)
+        return {
+            "max_connections": pool.max_connections,
+            "created": available + in_use,
+            "available": available,
+            "in_use": in_use,
+        }
+
+
+redis_manager = RedisClientManager(settings.REDIS_URL)
+
+
+def get_redis_client() -> redis.Redis:
+    return redis_manager.client
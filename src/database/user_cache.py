@@ -0,0 +1,78 @@
+import json
+import logging
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.entity.models import User, UserRole
+from src.utils.lru import LRUCache
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class UserCache:
+    """Snapshots of authenticated users: in-process LRU in front of Redis"""
+
+    def __init__(self, ttl: int, local_ttl: float, local_maxsize: int):
+        self.ttl = ttl
+        self._local = LRUCache(maxsize=local_maxsize, ttl=local_ttl)
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def _snapshot(user: User) -> dict:
+        # password hash is never cached
+        return {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "email_confirmed": user.email_confirmed,
+            "role": user.role.value,
+            "avatar": user.avatar,
+        }
+
+    @staticmethod
+    def _to_user(snapshot: dict) -> User:
+        """Build a detached User from the snapshot"""
+        return User(**{**snapshot, "role": UserRole(snapshot["role"])})
+
+    async def get(self, user_id: int) -> User | None:
+        snapshot = self._local.get(user_id)
+        if snapshot is None:
+            try:
+                raw = await self.redis.get(self._key(user_id))
+            except Exception as e:
+                logger.error(f"User cache read error: {e}")
+                return None
+            if raw is None:
+                return None
+            snapshot = json.loads(raw)
+            self._local.set(user_id, snapshot)
+        return self._to_user(snapshot)
+
+    async def set(self, user: User) -> None:
+        snapshot = self._snapshot(user)
+        self._local.set(user.id, snapshot)
+        try:
+            await self.redis.setex(self._key(user.id), self.ttl, json.dumps(snapshot))
+        except Exception as e:
+            logger.error(f"User cache write error: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local.pop(user_id)
+        try:
+            await self.redis.delete(self._key(user_id))
+        except Exception as e:
+            logger.error(f"User cache invalidation error: {e}")
+
+
+user_cache = UserCache(
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.USER_CACHE_LOCAL_MAXSIZE,
+)
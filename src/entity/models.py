@@ -10,14 +10,23 @@ from sqlalchemy import (
     DateTime,
     Date,
     BigInteger,
+    SmallInteger,
+    Computed,
     Enum as SqlEnum,
     Boolean,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
 
 from src.conf import constants
 
 
+CONTACT_SEARCH_DOCUMENT = (
+    "first_name || ' ' || last_name || ' ' || coalesce(email, '')"
+    " || ' ' || coalesce(phone::text, '') || ' ' || coalesce(description, '')"
+)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -61,6 +70,15 @@ class Contact(Base):
     )
     phone: Mapped[int] = mapped_column(BigInteger, nullable=True)
     birth_date: Mapped[date] = mapped_column(Date, nullable=False)
+    # month * 100 + day, indexed lookup key for upcoming birthdays
+    birthday_key: Mapped[int] = mapped_column(
+        SmallInteger,
+        Computed(
+            "(EXTRACT(MONTH FROM birth_date) * 100"
+            " + EXTRACT(DAY FROM birth_date))::smallint",
+            persisted=True,
+        ),
+    )
     description: Mapped[str] = mapped_column(
         String(constants.DESCRIPTION_MAX_LENGTH), nullable=True
     )
@@ -69,15 +87,47 @@ class Contact(Base):
         DateTime, default=func.now(), onupdate=func.now()
     )
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    # search: trigram (fuzzy, substring) and full-text (prefix) matching
+    search_text: Mapped[str] = mapped_column(
+        Computed(f"lower({CONTACT_SEARCH_DOCUMENT})", persisted=True),
+        deferred=True,
+    )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('simple', {CONTACT_SEARCH_DOCUMENT})", persisted=True),
+        deferred=True,
+    )
 
-    user: Mapped["User"] = relationship("User", backref="contacts", lazy="joined")
+    # contacts are always read by user_id, never load the owner implicitly
+    user: Mapped["User"] = relationship("User", backref="contacts", lazy="raise")
 
 
 Index("Contacts_birth_date_idx", Contact.birth_date)
+Index("Contacts_user_id_id_idx", Contact.user_id, Contact.id)
+Index("Contacts_user_id_birthday_key_idx", Contact.user_id, Contact.birthday_key)
+# GIN over user_id too (btree_gin), so a search reads one user's entries only
+Index(
+    "Contacts_user_id_search_text_trgm_idx",
+    Contact.user_id,
+    Contact.search_text,
+    postgresql_using="gin",
+    postgresql_ops={"search_text": "gin_trgm_ops"},
+)
+Index(
+    "Contacts_user_id_search_vector_idx",
+    Contact.user_id,
+    Contact.search_vector,
+    postgresql_using="gin",
+)
 
 
-@event.listens_for(Contact, "before_insert")
-async def validate_contact(mapper, connection, target):
+def check_contact_channels(email: str | None, phone: int | None) -> None:
     """Validate that Phone or Email or both are seted"""
-    if target.email is None and target.phone is None:
+    if email is None and phone is None:
         raise ValueError("Phone or Email must be declared")
+
+
+# backstop only: ContactsSchema already rejects such contacts with 422
+@event.listens_for(Contact, "before_insert")
+def validate_contact(mapper, connection, target):
+    check_contact_channels(target.email, target.phone)
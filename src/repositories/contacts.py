@@ -1,25 +1,83 @@
+import calendar
 import logging
+import re
 
 from datetime import date, timedelta
 
-from typing import Sequence
+from typing import AsyncIterator, Sequence
 from pydantic import EmailStr
 
-from sqlalchemy import select, union_all, or_, and_, func
-from sqlalchemy.orm import aliased
+from sqlalchemy import (
+    select,
+    insert,
+    update,
+    delete,
+    values,
+    column,
+    bindparam,
+    any_,
+    literal,
+    literal_column,
+    and_,
+    or_,
+    union_all,
+    func,
+    cast,
+    Integer,
+    Row,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
+from src.database.db import REPLICA
 from src.entity.models import Contact, User
-from src.schemas.contacts import ContactsSchema, ContactsUpdateSchema
+from src.schemas.contacts import (
+    ContactsSchema,
+    ContactsUpdateSchema,
+    ContactsBatchPatch,
+)
+from src.utils.timing import timed
 
 logger = logging.getLogger("uvicorn.error")
 
+FEB_28_KEY = 228
+FEB_29_KEY = 229
+
+# columns of ContactsResponse: reads fetch them as plain rows, no ORM hydration
+CONTACT_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.birth_date,
+    Contact.description,
+    Contact.created_at,
+    Contact.updated_at,
+)
+
+
+def birthday_key(day: date) -> int:
+    return day.month * 100 + day.day
+
+
+def birthday_window(start_date: date, end_date: date) -> tuple[int, int]:
+    """Birthday keys bounding the window, both ends included"""
+    start_key = birthday_key(start_date)
+    end_key = birthday_key(end_date)
+    if end_key == FEB_28_KEY and not calendar.isleap(end_date.year):
+        # Feb 29 birthdays are celebrated on Feb 28 in common years
+        end_key = FEB_29_KEY
+    return start_key, end_key
+
 
 class ContactsRepository:
     def __init__(self, session: AsyncSession, user: User):
         self.db = session
         self.user = user
 
+    @timed("db")
     async def get_contacts(
         self,
         limit: int,
@@ -27,107 +85,254 @@ class ContactsRepository:
         first_name: str = None,
         last_name: str = None,
         email: EmailStr = None,
-    ) -> Sequence[Contact]:
-        stmt = select(Contact).filter_by(user_id=self.user.id)
+        after_id: int = None,
+        replica: bool = True,
+    ) -> Sequence[Row]:
+        """Page by offset or, when after_id is set, seek past the last seen id"""
+        stmt = select(*CONTACT_COLUMNS).where(Contact.user_id == self.user.id)
         if first_name:
             stmt = stmt.filter(func.lower(Contact.first_name) == func.lower(first_name))
         if last_name:
             stmt = stmt.filter(func.lower(Contact.last_name) == func.lower(last_name))
         if email:
             stmt = stmt.filter(Contact.email == email)
-        stmt = stmt.offset(offset).limit(limit)
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+        if after_id is not None:
+            stmt = stmt.filter(Contact.id > after_id)
+        else:
+            stmt = stmt.offset(offset)
+        stmt = stmt.order_by(Contact.id).limit(limit)
+        contacts = await self.db.execute(stmt, bind_arguments={"replica": replica})
+        return contacts.all()
+
+    @timed("db")
+    async def search_contacts(
+        self, q: str, limit: int, after: tuple[float, int] | None = None
+    ) -> Sequence[Row]:
+        """Fuzzy (trigram) and prefix (full-text) search, best matches first
+
+        Rows carry an extra "rank" column; after is the (rank, id) of the last
+        row of the previous page.
+        """
+        text = q.strip().lower()
+        similarity = func.word_similarity(text, Contact.search_text)
+        matches = [literal(text).op("<%")(Contact.search_text)]
+        rank = similarity
+        words = re.findall(r"\w+", text)
+        if words:
+            ts_query = func.to_tsquery(
+                literal_column("'simple'::regconfig"),
+                " & ".join(f"{word}:*" for word in words),
+            )
+            matches.append(Contact.search_vector.op("@@")(ts_query))
+            rank = func.greatest(
+                func.ts_rank(Contact.search_vector, ts_query), similarity
+            )
 
-    async def get_contact_by_id(self, cnt_id: int) -> Contact | None:
-        stmt = select(Contact).filter_by(user_id=self.user.id).filter_by(id=cnt_id)
-        contact = await self.db.execute(stmt)
-        return contact.scalar_one_or_none()
+        stmt = select(*CONTACT_COLUMNS, rank.label("rank")).where(
+            Contact.user_id == self.user.id, or_(*matches)
+        )
+        if after is not None:
+            after_rank, after_id = after
+            stmt = stmt.where(
+                or_(rank < after_rank, and_(rank == after_rank, Contact.id > after_id))
+            )
+        stmt = stmt.order_by(rank.desc(), Contact.id).limit(limit)
+        contacts = await self.db.execute(stmt, bind_arguments=REPLICA)
+        return contacts.all()
+
+    async def stream_contacts(self) -> AsyncIterator[Sequence[Row]]:
+        """Yield all user's contacts as column rows, chunk by chunk"""
+        stmt = (
+            select(*CONTACT_COLUMNS)
+            .where(Contact.user_id == self.user.id)
+            .order_by(Contact.id)
+            .execution_options(yield_per=settings.CONTACTS_EXPORT_CHUNK_SIZE)
+        )
+        result = await self.db.stream(stmt, bind_arguments=REPLICA)
+        async for rows in result.partitions():
+            yield rows
+
+    @timed("db")
+    async def get_contact_by_id(self, cnt_id: int) -> Row | None:
+        stmt = select(*CONTACT_COLUMNS).where(
+            Contact.user_id == self.user.id, Contact.id == cnt_id
+        )
+        contact = await self.db.execute(stmt, bind_arguments=REPLICA)
+        return contact.one_or_none()
 
+    @timed("db")
     async def create_contact(self, body: ContactsSchema) -> Contact:
-        contact = Contact(**body.model_dump(), user=self.user)
+        contact = Contact(**body.model_dump(), user_id=self.user.id)
         self.db.add(contact)
         await self.db.commit()
         await self.db.refresh(contact)
         return contact
 
-    async def remove_contact(self, cnt_id: int) -> Contact | None:
-        contact = await self.get_contact_by_id(cnt_id)
-        if contact:
-            await self.db.delete(contact)
-            await self.db.commit()
+    @timed("db")
+    async def create_contacts(self, bodies: list[ContactsSchema]) -> int:
+        """Insert a batch of contacts with multi-row INSERT statements"""
+        if not bodies:
+            return 0
+        await self.db.execute(
+            insert(Contact),
+            [{**body.model_dump(), "user_id": self.user.id} for body in bodies],
+        )
+        await self.db.commit()
+        return len(bodies)
+
+    @timed("db")
+    async def remove_contact(self, cnt_id: int) -> Row | None:
+        stmt = (
+            delete(Contact)
+            .where(Contact.id == cnt_id, Contact.user_id == self.user.id)
+            .returning(*CONTACT_COLUMNS)
+        )
+        result = await self.db.execute(
+            stmt, execution_options={"synchronize_session": False}
+        )
+        contact = result.one_or_none()
+        await self.db.commit()
         return contact
 
+    @timed("db")
     async def update_contact(
         self, cnt_id: int, body: ContactsUpdateSchema
-    ) -> Contact | None:
-        contact = await self.get_contact_by_id(cnt_id)
-        if contact:
-            update_data = body.model_dump(exclude_unset=True)
+    ) -> Row | None:
+        stmt = (
+            update(Contact)
+            .where(Contact.id == cnt_id, Contact.user_id == self.user.id)
+            .values({**body.model_dump(exclude_unset=True), "updated_at": func.now()})
+            .returning(*CONTACT_COLUMNS)
+        )
+        result = await self.db.execute(
+            stmt, execution_options={"synchronize_session": False}
+        )
+        contact = result.one_or_none()
+        await self.db.commit()
+        return contact
 
-            for key, value in update_data.items():
-                setattr(contact, key, value)
+    @staticmethod
+    def _ids_in(ids: list[int]):
+        """id = ANY(:ids), one array parameter whatever the number of ids"""
+        return Contact.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
 
-            await self.db.commit()
-            await self.db.refresh(contact)
+    @timed("db")
+    async def get_contacts_by_ids(self, ids: list[int]) -> Sequence[Row]:
+        stmt = select(*CONTACT_COLUMNS).where(
+            Contact.user_id == self.user.id, self._ids_in(ids)
+        )
+        contacts = await self.db.execute(stmt, bind_arguments=REPLICA)
+        return contacts.all()
 
-        return contact
+    @timed("db")
+    async def update_contacts(self, patches: list[ContactsBatchPatch]) -> list[Row]:
+        """Apply patches with one UPDATE ... FROM (VALUES ...) per set of fields"""
+        merged: dict[int, dict] = {}
+        for patch in patches:
+            merged.setdefault(patch.id, {}).update(patch.model_dump(exclude_unset=True))
 
-    def _get_upcoming_birthday_stmt(self, start_date: date, end_date: date):
-        """Add filter of the birthdays for statement"""
-        return (
-            select(Contact)
-            .filter_by(user_id=self.user.id)
-            .filter(
-                or_(
-                    and_(
-                        func.extract("month", Contact.birth_date)
-                        == func.extract("month", start_date),
-                        func.extract("day", Contact.birth_date)
-                        >= func.extract("day", start_date),
-                    ),
-                    func.extract("month", Contact.birth_date)
-                    > func.extract("month", start_date),
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for data in merged.values():
+            fields = tuple(sorted(key for key in data if key != "id"))
+            groups.setdefault(fields, []).append(data)
+
+        table = Contact.__table__
+        updated = []
+        for fields, rows in groups.items():
+            names = ("id", *fields)
+            patch = values(
+                *(column(name, table.c[name].type) for name in names), name="patch"
+            ).data([tuple(row[name] for name in names) for row in rows])
+            stmt = (
+                update(Contact)
+                .where(Contact.id == patch.c.id, Contact.user_id == self.user.id)
+                .values(
+                    {
+                        # a column of NULLs only would be typed as text
+                        **{
+                            name: cast(patch.c[name], table.c[name].type)
+                            for name in fields
+                        },
+                        "updated_at": func.now(),
+                    }
                 )
+                .returning(*CONTACT_COLUMNS)
             )
-            .filter(
-                or_(
-                    func.extract("month", Contact.birth_date)
-                    < func.extract("month", end_date),
-                    and_(
-                        func.extract("month", Contact.birth_date)
-                        == func.extract("month", end_date),
-                        func.extract("day", Contact.birth_date)
-                        <= func.extract("day", end_date),
-                    ),
-                )
+            result = await self.db.execute(
+                stmt, execution_options={"synchronize_session": False}
+            )
+            updated.extend(result.all())
+        await self.db.commit()
+        return updated
+
+    @timed("db")
+    async def remove_contacts(self, ids: list[int]) -> Sequence[int]:
+        stmt = (
+            delete(Contact)
+            .where(Contact.user_id == self.user.id, self._ids_in(ids))
+            .returning(Contact.id)
+        )
+        result = await self.db.execute(
+            stmt, execution_options={"synchronize_session": False}
+        )
+        removed = result.scalars().all()
+        await self.db.commit()
+        return removed
+
+    @timed("db")
+    async def get_all_contacts(self) -> Sequence[Row]:
+        """All user's contacts read from the primary, for precomputed digests"""
+        stmt = select(*CONTACT_COLUMNS).where(Contact.user_id == self.user.id)
+        contacts = await self.db.execute(stmt)
+        return contacts.all()
+
+    def _get_upcoming_birthday_stmt(
+        self, start_date: date, end_date: date, limit: int, offset: int
+    ):
+        """Filter birthdays by the indexed month*100+day key
+
+        A window over the year end is two key ranges, rest of this year first.
+        Each one is read in index order up to the page end and the two are
+        concatenated, an OR of the ranges would sort all matches of the user.
+        """
+        start_key, end_key = birthday_window(start_date, end_date)
+        stmt = select(*CONTACT_COLUMNS).where(Contact.user_id == self.user.id)
+        order = (Contact.birthday_key, Contact.id)
+        if start_date.year == end_date.year:
+            return (
+                stmt.filter(Contact.birthday_key.between(start_key, end_key))
+                .order_by(*order)
+                .limit(limit)
+                .offset(offset)
             )
-            .order_by(
-                func.extract("month", Contact.birth_date),
-                func.extract("day", Contact.birth_date),
+        ranges = [Contact.birthday_key >= start_key, Contact.birthday_key <= end_key]
+        parts = union_all(
+            *(
+                stmt.add_columns(Contact.birthday_key, literal(part).label("part"))
+                .filter(key_range)
+                .order_by(*order)
+                .limit(offset + limit)
+                for part, key_range in enumerate(ranges)
             )
+        ).subquery()
+        return (
+            select(*(parts.c[column.key] for column in CONTACT_COLUMNS))
+            .order_by(parts.c.part, parts.c.birthday_key, parts.c.id)
+            .limit(limit)
+            .offset(offset)
         )
 
-    async def get_contacts_upcoming_birthdays(self, days: int, limit: int, offset: int):
+    @timed("db")
+    async def get_contacts_upcoming_birthdays(
+        self, days: int, limit: int, offset: int, replica: bool = True
+    ):
         today = date.today()
         end_date = today + timedelta(days=days)
-        year_end = date(today.year, 12, 31)
-        next_year = date(today.year + 1, 1, 1)
 
         logger.debug(
             f"Search contacts with birthdays for {days} days from {today} to {end_date}"
         )
 
-        if end_date > year_end:
-            stmt_current_year = self._get_upcoming_birthday_stmt(today, year_end)
-            stmt_next_year = self._get_upcoming_birthday_stmt(next_year, end_date)
-            stmt = select(
-                aliased(
-                    Contact, union_all(stmt_current_year, stmt_next_year).subquery()
-                )
-            )
-        else:
-            stmt = self._get_upcoming_birthday_stmt(today, end_date)
-
-        contacts = await self.db.execute(stmt.limit(limit).offset(offset))
-        return contacts.scalars().all()
+        stmt = self._get_upcoming_birthday_stmt(today, end_date, limit, offset)
+        contacts = await self.db.execute(stmt, bind_arguments={"replica": replica})
+        return contacts.all()
@@ -1,10 +1,15 @@
 import logging
 
+from typing import Sequence
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.entity.models import User
+from src.database.db import REPLICA
+from src.database.user_cache import user_cache
+from src.entity.models import User, UserRole
 from src.schemas.user import UserCreate
+from src.utils.timing import timed
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -13,21 +18,30 @@ class UsersRepository:
     def __init__(self, session: AsyncSession):
         self.db = session
 
-    async def get_user_by_id(self, user_id: int) -> User | None:
+    @timed("db")
+    async def get_user_ids(self) -> Sequence[int]:
+        users = await self.db.execute(select(User.id), bind_arguments=REPLICA)
+        return users.scalars().all()
+
+    @timed("db")
+    async def get_user_by_id(self, user_id: int, replica: bool = True) -> User | None:
         stmt = select(User).filter_by(id=user_id)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(stmt, bind_arguments={"replica": replica})
         return user.scalar_one_or_none()
 
+    @timed("db")
     async def get_user_by_username(self, username: str) -> User | None:
         stmt = select(User).filter_by(username=username)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(stmt, bind_arguments=REPLICA)
         return user.scalar_one_or_none()
 
-    async def get_user_by_email(self, email: str) -> User | None:
+    @timed("db")
+    async def get_user_by_email(self, email: str, replica: bool = True) -> User | None:
         stmt = select(User).filter_by(email=email)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(stmt, bind_arguments={"replica": replica})
         return user.scalar_one_or_none()
 
+    @timed("db")
     async def create_user(
         self, body: UserCreate, hashed_password: str, avatar: str = None
     ) -> User:
@@ -41,14 +55,33 @@ class UsersRepository:
         await self.db.refresh(user)
         return user
 
+    @timed("db")
+    async def update_password(self, user: User, hashed_password: str) -> None:
+        user.password = hashed_password
+        await self.db.commit()
+        await self.db.refresh(user)
+
+    @timed("db")
     async def confirmed_email(self, email: str) -> None:
-        user = await self.get_user_by_email(email)
+        user = await self.get_user_by_email(email, replica=False)
         user.email_confirmed = True
         await self.db.commit()
+        await user_cache.invalidate(user.id)
 
+    @timed("db")
     async def update_avatar_url(self, email: str, url: str) -> User:
-        user = await self.get_user_by_email(email)
+        user = await self.get_user_by_email(email, replica=False)
         user.avatar = url
         await self.db.commit()
         await self.db.refresh(user)
+        await user_cache.invalidate(user.id)
+        return user
+
+    @timed("db")
+    async def update_role(self, email: str, role: UserRole) -> User:
+        user = await self.get_user_by_email(email, replica=False)
+        user.role = role
+        await self.db.commit()
+        await self.db.refresh(user)
+        await user_cache.invalidate(user.id)
         return user
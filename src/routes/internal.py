@@ -1,11 +1,15 @@
 import logging
 from asyncio import wait_for
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from src.database.db import get_db
-from src.database.redis import get_redis_client
+from src.database.db import get_db, sessionmanager
+from src.database.redis import get_redis_client, redis_manager
+from src.services.passwords import password_hasher
+from src.services.rate_limiter import rate_limiter
+from src.utils.timing import timing_metrics
 
 router = APIRouter(tags=["internal"])
 logger = logging.getLogger("uvicorn.error")
@@ -31,6 +35,9 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
             detail="Database is not configured correctly",
         )
 
+    # Probe read replicas, unhealthy ones are taken out of rotation
+    await sessionmanager.check_replicas()
+
     try:
         # Test the Redis DB connection
         redis_client = get_redis_client()
@@ -44,6 +51,39 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
     return {"status": 1, "message": "App works!"}
 
 
+@router.get("/metrics/db")
+async def db_metrics():
+    """Connection pool state and timings of the SQL DataBase"""
+    return sessionmanager.stats()
+
+
+@router.get("/metrics/passwords")
+async def passwords_metrics():
+    """Load of the password hashing pool"""
+    return password_hasher.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request stage time histograms of all workers, Prometheus text format"""
+    try:
+        body = await timing_metrics.render()
+    except Exception as e:
+        # a partial (one worker) answer would look like counter resets
+        logger.error(f"Timing metrics render error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Metrics storage is unavailable",
+        )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@router.get("/metrics/redis")
+async def redis_metrics():
+    """Shared Redis connection pool usage"""
+    return {**redis_manager.stats(), "rate_limit_fallbacks": rate_limiter.fallbacks}
+
+
 @router.get("/")
 @router.get("/about")
 async def intro(request: Request):
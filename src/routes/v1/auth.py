@@ -17,11 +17,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.db import get_db
 from src.services.auth import AuthService, oauth2_scheme
 from src.services.email import send_email
+from src.services.users import verify_gravatar
 from src.schemas.token import TokenResponse
 from src.schemas.user import UserResponse, UserCreate
 from src.utils.depended_services import get_auth_service
+from src.utils.timing import TimedRoute
 
-router = APIRouter(prefix="/auth", tags=["authorization"])
+router = APIRouter(prefix="/auth", tags=["authorization"], route_class=TimedRoute)
 logger = logging.getLogger("uvicorn.error")
 
 @router.post("/sign-up", response_model=UserResponse)
@@ -35,6 +37,7 @@ async def register(
     background_tasks.add_task(
         send_email, user_data.email, user_data.username, str(request.base_url)
     )
+    background_tasks.add_task(verify_gravatar, user.email)
     return user
 
 
@@ -1,32 +1,185 @@
 import logging
 
-from typing import Optional
+from datetime import date
+from typing import Awaitable, Callable, Optional, Sequence
 from pydantic import EmailStr
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    Query,
+    Path,
+    Request,
+    Response,
+    UploadFile,
+    File,
+)
+from fastapi.responses import StreamingResponse
 
-from src.database.db import get_db
+from src.conf import constants
+from src.conf.config import settings
+from src.database.db import get_db, LazySession
 from src.entity.models import User
+from src.utils.contacts_io import CONTACTS_FORMATS_PATTERN, MEDIA_TYPES
+from src.utils.cursors import encode_cursor, decode_cursor
 from src.utils.depended_services import get_authorized_user
+from src.utils.responses import FastJSONResponse
+from src.utils.timing import SERIALIZE, Span, TimedRoute
 from src.services.contacts import ContactsService
-from src.schemas.contacts import ContactsSchema, ContactsUpdateSchema, ContactsResponse
+from src.services.contacts_cache import contacts_cache
+from src.schemas.contacts import (
+    ContactsSchema,
+    ContactsUpdateSchema,
+    ContactsResponse,
+    ContactsImportResponse,
+    ContactsBatchIds,
+    ContactsBatchUpdate,
+    ContactsBatchResult,
+    contacts_rows_json,
+)
+
+router = APIRouter(
+    prefix="/contacts",
+    tags=["contacts"],
+    default_response_class=FastJSONResponse,
+    route_class=TimedRoute,
+)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def dump_contacts(contacts) -> bytes:
+    with Span(SERIALIZE):
+        return contacts_rows_json.dump_json(
+            [row if isinstance(row, dict) else row._asdict() for row in contacts]
+        )
+
+
+def contacts_response(contacts, response: Response, headers: dict | None = None):
+    """Dump rows to JSON bytes at once, skipping response model validation"""
+    if settings.CONTACTS_FAST_JSON:
+        return FastJSONResponse(dump_contacts(contacts), headers=headers)
+    if headers:
+        response.headers.update(headers)
+    return contacts
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 
-router = APIRouter(prefix="/contacts", tags=["contacts"])
+async def cached_contacts_response(
+    request: Request,
+    response: Response,
+    user: User,
+    name: str,
+    params: dict,
+    load: Callable[[bool], Awaitable[tuple[Sequence, dict]]],
+):
+    """Serve a read from the per-user contacts cache, 304 when the ETag matches
+
+    load(replica) returns the rows and extra headers of the response; it runs
+    only on a cache miss. Rows that go into the cache are read from the primary,
+    a lagging replica would pin stale rows under the new version. Without Redis
+    the read falls back to the plain path.
+    """
+    version = None
+    if settings.CONTACTS_CACHE_ENABLED:
+        version = await contacts_cache.version(user.id)
+    if version is None:
+        contacts, headers = await load(True)
+        return contacts_response(contacts, response, headers)
+
+    key = contacts_cache.key(user.id, version, name, params)
+    etag = contacts_cache.etag(key)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    cached = await contacts_cache.get(key)
+    if cached is None:
+        contacts, headers = await load(False)
+        body = dump_contacts(contacts)
+        await contacts_cache.set(key, body, headers)
+    else:
+        body, headers = cached
+    return FastJSONResponse(body, headers={**headers, **cache_headers})
 
 
 @router.get("/", response_model=list[ContactsResponse])
 async def get_contacts(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=10, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Value of X-Next-Cursor header from the previous page"
+    ),
     first_name: Optional[str] = Query(None),
     last_name: Optional[str] = Query(None),
     email: Optional[EmailStr] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+
+    async def load(replica: bool):
+        service = ContactsService(db, user)
+        contacts = await service.get_contacts(
+            limit, offset, first_name, last_name, email, after_id, replica
+        )
+        await db.release()
+        headers = {}
+        if len(contacts) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(contacts[-1].id)
+        return contacts, headers
+
+    params = {
+        "limit": limit,
+        "offset": offset,
+        "after_id": after_id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+    }
+    return await cached_contacts_response(request, response, user, "list", params, load)
+
+
+@router.get("/search", response_model=list[ContactsResponse])
+async def search_contacts(
+    response: Response,
+    q: str = Query(min_length=1, max_length=constants.DESCRIPTION_MAX_LENGTH),
+    limit: int = Query(10, ge=10, le=500),
+    cursor: Optional[str] = Query(
+        None, description="Value of X-Next-Cursor header from the previous page"
+    ),
+    db: LazySession = Depends(get_db),
+    user: User = Depends(get_authorized_user),
+):
+    after = tuple(decode_cursor(cursor, float, int)) if cursor else None
     service = ContactsService(db, user)
-    return await service.get_contacts(limit, offset, first_name, last_name, email)
+    contacts, next_after = await service.search_contacts(q, limit, after)
+    await db.release()
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(*next_after)} if next_after else {}
+    return contacts_response(contacts, response, headers)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_contacts(
+    fmt: str = Query("ndjson", alias="format", pattern=CONTACTS_FORMATS_PATTERN),
+    user: User = Depends(get_authorized_user),
+):
+    return StreamingResponse(
+        ContactsService.export_contacts(user, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{fmt}"'},
+    )
 
 
 @router.get(
@@ -38,11 +191,12 @@ async def get_contacts(
 )
 async def get_contact(
     cnt_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
     service = ContactsService(db, user)
     contact = await service.get_contact(cnt_id)
+    await db.release()
     if contact is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,18 +212,61 @@ async def get_contact(
 )
 async def create_contact(
     body: ContactsSchema,
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
     service = ContactsService(db, user)
     return await service.create_contact(body)
 
 
+@router.post("/bulk", response_model=ContactsImportResponse)
+async def import_contacts(
+    file: UploadFile = File(description="CSV with header row or NDJSON"),
+    fmt: str = Query("csv", alias="format", pattern=CONTACTS_FORMATS_PATTERN),
+    db: LazySession = Depends(get_db),
+    user: User = Depends(get_authorized_user),
+):
+    service = ContactsService(db, user)
+    return await service.import_contacts(file, fmt)
+
+
+@router.post("/batch/get", response_model=list[ContactsBatchResult])
+async def get_contacts_batch(
+    body: ContactsBatchIds,
+    db: LazySession = Depends(get_db),
+    user: User = Depends(get_authorized_user),
+):
+    service = ContactsService(db, user)
+    results = await service.get_contacts_batch(body.ids)
+    await db.release()
+    return results
+
+
+@router.patch("/batch", response_model=list[ContactsBatchResult])
+async def update_contacts_batch(
+    body: ContactsBatchUpdate,
+    db: LazySession = Depends(get_db),
+    user: User = Depends(get_authorized_user),
+):
+    service = ContactsService(db, user)
+    return await service.update_contacts_batch(body.items)
+
+
+@router.post("/batch/delete", response_model=list[ContactsBatchResult])
+async def delete_contacts_batch(
+    body: ContactsBatchIds,
+    db: LazySession = Depends(get_db),
+    user: User = Depends(get_authorized_user),
+):
+    service = ContactsService(db, user)
+    return await service.remove_contacts_batch(body.ids)
+
+
 @router.put("/{cnt_id}", response_model=ContactsResponse)
 async def update_contact(
     cnt_id: int,
     body: ContactsUpdateSchema,
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
     service = ContactsService(db, user)
@@ -85,7 +282,7 @@ async def update_contact(
 @router.delete("/{cnt_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     cnt_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
     service = ContactsService(db, user)
@@ -95,11 +292,24 @@ async def delete_contact(
 
 @router.get("/birthdays/{days}", response_model=list[ContactsResponse])
 async def upcoming_birthdays(
+    request: Request,
+    response: Response,
     days: int = Path(..., gt=0, lt=365),
     limit: int = Query(10, ge=10, le=500),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    db: LazySession = Depends(get_db),
     user: User = Depends(get_authorized_user),
 ):
-    service = ContactsService(db, user)
-    return await service.get_contacts_upcoming_birthdays(days, limit, offset)
+    async def load(replica: bool):
+        service = ContactsService(db, user)
+        contacts = await service.get_contacts_upcoming_birthdays(
+            days, limit, offset, replica
+        )
+        await db.release()
+        return contacts, {}
+
+    # the window moves with the date, so today is part of the key
+    params = {"days": days, "limit": limit, "offset": offset, "today": date.today()}
+    return await cached_contacts_response(
+        request, response, user, "birthdays", params, load
+    )
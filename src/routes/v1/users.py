@@ -5,20 +5,20 @@ from fastapi import (
     Request,
     HTTPException,
     status,
-    UploadFile,
-    File,
     BackgroundTasks,
 )
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from src.conf.config import settings
 from src.utils.depended_services import (
     get_users_service,
     get_authorized_user,
     get_admin_user,
+    limit_by_user,
+    limit_by_ip,
 )
 from src.utils.email_tokens import get_email_from_token
+from src.utils.timing import TimedRoute
+from src.utils.uploads import receive_upload
 from src.entity.models import User
 from src.schemas.user import UserResponse
 from src.schemas.email import RequestEmail
@@ -27,15 +27,16 @@ from src.services.users import UsersService
 from src.services.email import send_email
 from src.services.upload_to_cloudinary import UploadFileService
 
-router = APIRouter(prefix="/users", tags=["users"])
-limiter = Limiter(key_func=get_remote_address)
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 logger = logging.getLogger("uvicorn.error")
 
 
-@router.get("/me", response_model=UserResponse)
-@limiter.limit(settings.LIMIT4_USERS_ME)
+@router.get(
+    "/me",
+    response_model=UserResponse,
+    dependencies=[limit_by_user("users_me", settings.LIMIT4_USERS_ME)],
+)
 async def me(
-    request: Request,
     token: str = Depends(oauth2_scheme),
     user: User = Depends(get_authorized_user),
 ):
@@ -58,8 +59,10 @@ async def confirmed_email(
     return {"message": "Yours Email confirmed"}
 
 
-@router.post("/resend_email")
-@limiter.limit(settings.LIMIT4_USERS_RESENT)
+@router.post(
+    "/resend_email",
+    dependencies=[limit_by_ip("users_resend", settings.LIMIT4_USERS_RESENT)],
+)
 async def resend_email(
     body: RequestEmail,
     background_tasks: BackgroundTasks,
@@ -80,13 +83,34 @@ async def resend_email(
     return {"message": "Please check your inbox to receive a confirmation email"}
 
 
-@router.patch("/avatar", response_model=UserResponse)
+AVATAR_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+@router.patch("/avatar", response_model=UserResponse, openapi_extra=AVATAR_UPLOAD_BODY)
 async def update_avatar_user(
-    file: UploadFile = File(),
+    request: Request,
     user: User = Depends(get_authorized_user),
     users_service: UsersService = Depends(get_users_service),
 ):
-    avatar_url = UploadFileService().upload_file(file, user.username)
+    # the body is parsed here, so the size limit applies while it streams in
+    file = await receive_upload(request, "file", settings.AVATAR_MAX_BYTES)
+    try:
+        avatar_url = await UploadFileService().upload_file(file, user.username)
+    finally:
+        await file.close()
 
     user = await users_service.update_avatar_url(user.email, avatar_url)
 
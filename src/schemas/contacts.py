@@ -1,9 +1,18 @@
 from datetime import datetime, date
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    EmailStr,
+    TypeAdapter,
+    model_validator,
+)
+from typing_extensions import TypedDict
 
 from src.conf import constants
+from src.entity.models import check_contact_channels
 
 
 class ContactsSchema(BaseModel):
@@ -36,6 +45,11 @@ class ContactsSchema(BaseModel):
         description="Contact's description",
     )
 
+    @model_validator(mode="after")
+    def check_channels(self):
+        check_contact_channels(self.email, self.phone)
+        return self
+
 
 class ContactsUpdateSchema(BaseModel):
     first_name: Optional[str] = Field(
@@ -84,3 +98,54 @@ class ContactsResponse(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ContactsRow(TypedDict):
+    """ContactsResponse shape for already valid DB rows, serialized as is"""
+
+    id: int
+    first_name: str
+    last_name: str
+    email: Optional[str]
+    phone: Optional[int]
+    birth_date: date
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+contacts_row_json = TypeAdapter(ContactsRow)
+contacts_rows_json = TypeAdapter(list[ContactsRow])
+
+
+class ContactsImportError(BaseModel):
+    row: int = Field(description="1-based record number in the uploaded file")
+    errors: list[str]
+
+
+class ContactsImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ContactsImportError] = Field(
+        description="Per-row errors, truncated to the configured maximum"
+    )
+
+
+class ContactsBatchIds(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=constants.CONTACTS_BATCH_MAX_SIZE)
+
+
+class ContactsBatchPatch(ContactsUpdateSchema):
+    id: int
+
+
+class ContactsBatchUpdate(BaseModel):
+    items: list[ContactsBatchPatch] = Field(
+        min_length=1, max_length=constants.CONTACTS_BATCH_MAX_SIZE
+    )
+
+
+class ContactsBatchResult(BaseModel):
+    id: int
+    status: Literal["ok", "not_found"]
+    contact: Optional[ContactsResponse] = None
@@ -3,22 +3,23 @@ import hashlib
 from datetime import datetime, timedelta, timezone
 
 import jwt
-import bcrypt
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from libgravatar import Gravatar
 
 from src.conf.config import settings
-from src.database.redis import get_redis_client
+from src.database.user_cache import user_cache
 from src.entity.models import User
 from src.repositories.users import UsersRepository
 from src.schemas.user import UserCreate
+from src.services.passwords import password_hasher
+from src.services.token_blacklist import token_blacklist
+from src.utils.gravatar import gravatar_url
+from src.utils.timing import timed
 
 logger = logging.getLogger("uvicorn.error")
 
-redis_client = get_redis_client()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
@@ -28,17 +29,18 @@ class AuthService:
         self.user_repository = UsersRepository(self.db)
         # self.refresh_token_repository = RefreshTokenRepository(self.db)
 
-    def _hash_password(self, password: str) -> str:  # noqa
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode(), salt)
-        return hashed_password.decode()
+    @timed("bcrypt")
+    async def _hash_password(self, password: str) -> str:  # noqa
+        return await password_hasher.hash(password)
 
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    @timed("bcrypt")
+    async def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify(plain_password, hashed_password)
 
     def _hash_token(self, token: str):  # noqa
         return hashlib.sha256(token.encode()).hexdigest()
 
+    @timed("auth")
     async def authenticate(self, username: str, password: str) -> User:
         user = await self.user_repository.get_user_by_username(username)
         if not user:
@@ -53,14 +55,20 @@ class AuthService:
                 detail="Email not confirmed yet",
             )
 
-        if not self._verify_password(password, user.password):
+        if not await self._verify_password(password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
             )
 
+        if password_hasher.needs_rehash(user.password):
+            # work factor was changed, upgrade the hash while we know the password
+            hashed_password = await self._hash_password(password)
+            await self.user_repository.update_password(user, hashed_password)
+
         return user
 
+    @timed("auth")
     async def register_user(self, user_data: UserCreate) -> User:
         if await self.user_repository.get_user_by_username(user_data.username):
             raise HTTPException(
@@ -71,14 +79,10 @@ class AuthService:
                 status_code=status.HTTP_409_CONFLICT, detail="Email already exists"
             )
 
-        avatar = None
-        try:
-            g = Gravatar(user_data.email)
-            avatar = g.get_image()
-        except Exception as e:
-            logger.error(e)
+        # pure hash, existence is checked later by verify_gravatar job
+        avatar = gravatar_url(str(user_data.email))
 
-        hashed_password = self._hash_password(user_data.password)
+        hashed_password = await self._hash_password(user_data.password)
         user = await self.user_repository.create_user(
             user_data, hashed_password, avatar
         )
@@ -97,13 +101,11 @@ class AuthService:
     async def revoke_access_token(self, token: str) -> None:
         payload = self.decode_and_validate_access_token(token)
         exp = payload.get("exp")
-        logger.debug(
-            f"Revoked auth token {exp - datetime.now(timezone.utc).timestamp()}"
-        )
         if exp:
-            await redis_client.setex(
-                f"bl:{token}", int(exp - datetime.now(timezone.utc).timestamp()), "1"
-            )
+            ttl = int(exp - datetime.now(timezone.utc).timestamp())
+            logger.debug(f"Revoked auth token {ttl}")
+            if ttl > 0:
+                await token_blacklist.revoke(self._hash_token(token), ttl)
         return None
 
     def decode_and_validate_access_token(self, token: str) -> dict:
@@ -117,8 +119,9 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token wrong"
             )
 
+    @timed("auth")
     async def get_current_user(self, token: str = Depends(oauth2_scheme)) -> User:
-        if await redis_client.exists(f"bl:{token}"):
+        if await token_blacklist.is_revoked(self._hash_token(token)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
             )
@@ -130,10 +133,16 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
             )
-        user = await self.user_repository.get_user_by_id(int(user_id))
+        user = await user_cache.get(int(user_id))
+        if user is not None:
+            return user
+
+        # from the primary: a lagging replica would put a stale user in the cache
+        user = await self.user_repository.get_user_by_id(int(user_id), replica=False)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
             )
+        await user_cache.set(user)
         return user
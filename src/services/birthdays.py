@@ -0,0 +1,193 @@
+import logging
+
+from datetime import date, timedelta
+from typing import Iterable
+
+from sqlalchemy import Row
+
+from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.database.redis import get_redis_client
+from src.entity.models import Contact, User
+from src.repositories.contacts import (
+    CONTACT_COLUMNS,
+    ContactsRepository,
+    birthday_key,
+    birthday_window,
+)
+from src.repositories.users import UsersRepository
+from src.schemas.contacts import contacts_row_json, contacts_rows_json
+from src.services.contacts_cache import contacts_cache
+
+logger = logging.getLogger("uvicorn.error")
+
+# birthday keys run up to 1231, so shifting by 1300 keeps the order of a year
+YEAR_SHIFT = 1300
+ID_SPAN = 2**32
+
+
+def _position(key: int, start_key: int) -> int:
+    """Place of a birthday key in the year starting at start_key"""
+    return key - start_key if key >= start_key else key - start_key + YEAR_SHIFT
+
+
+def _score(row: dict, start_key: int) -> int:
+    # exact in a double: positions are below 2600 and ids below 2**32
+    return _position(birthday_key(row["birth_date"]), start_key) * ID_SPAN + row["id"]
+
+
+def _as_dict(contact: Row | Contact) -> dict:
+    if isinstance(contact, Row):
+        return contact._asdict()
+    return {column.key: getattr(contact, column.key) for column in CONTACT_COLUMNS}
+
+
+class BirthdayDigest:
+    """Upcoming birthdays of each user, precomputed in Redis for the current day
+
+    birthdays:{user_id} scores contacts by the place of their birthday in the
+    year starting at the digest day and then by id, so a window is one score
+    range in the order of the database query. Rows are kept as JSON in the
+    birthdays:{user_id}:rows hash and birthdays:{user_id}:day tells the day
+    the digest was built for; reads of any other day fall back to the database.
+    Every update bumps birthdays:{user_id}:gen, which a rebuild watches.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    @staticmethod
+    def _keys(user_id: int) -> tuple[str, str, str, str]:
+        key = f"birthdays:{user_id}"
+        return key, f"{key}:rows", f"{key}:day", f"{key}:gen"
+
+    @staticmethod
+    def _write(pipe, scores_key: str, rows_key: str, rows: list[dict], start_key: int):
+        pipe.zadd(scores_key, {row["id"]: _score(row, start_key) for row in rows})
+        pipe.hset(
+            rows_key,
+            mapping={row["id"]: contacts_row_json.dump_json(row) for row in rows},
+        )
+
+    async def read(
+        self, user_id: int, days: int, limit: int, offset: int
+    ) -> list[dict] | None:
+        """Contacts with birthdays in the next days, None when not precomputed"""
+        if not settings.BIRTHDAYS_DIGEST_ENABLED:
+            return None
+        today = date.today()
+        start_key, end_key = birthday_window(today, today + timedelta(days=days))
+        max_score = (_position(end_key, start_key) + 1) * ID_SPAN - 1
+        scores_key, rows_key, day_key, _ = self._keys(user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.get(day_key)
+                pipe.zrangebyscore(scores_key, 0, max_score, start=offset, num=limit)
+                day, ids = await pipe.execute()
+            if day is None or day.decode() != today.isoformat():
+                return None
+            rows = await self.redis.hmget(rows_key, ids) if ids else []
+        except Exception as e:
+            logger.error(f"Birthday digest read error: {e}")
+            return None
+        if None in rows:
+            # rebuilt in between
+            return None
+        return contacts_rows_json.validate_json(b"[" + b",".join(rows) + b"]")
+
+    async def rebuild(self, repository: ContactsRepository, today: date) -> bool:
+        """Replace the user's digest with one computed from the database
+
+        The transaction watches the digest generation and the user's contacts
+        version, so a write that lands after the contacts were read makes it
+        start over.
+        """
+        user_id = repository.user.id
+        scores_key, rows_key, day_key, gen_key = self._keys(user_id)
+        start_key = birthday_key(today)
+
+        async def swap(pipe):
+            rows = [_as_dict(row) for row in await repository.get_all_contacts()]
+            pipe.multi()
+            pipe.delete(scores_key, rows_key)
+            if rows:
+                self._write(pipe, scores_key, rows_key, rows, start_key)
+                pipe.expire(scores_key, self.ttl)
+                pipe.expire(rows_key, self.ttl)
+            pipe.set(day_key, today.isoformat(), ex=self.ttl)
+
+        try:
+            await self.redis.transaction(
+                swap, gen_key, contacts_cache.version_key(user_id)
+            )
+        except Exception as e:
+            logger.error(f"Birthday digest rebuild error for user {user_id}: {e}")
+            return False
+        return True
+
+    async def update(
+        self,
+        user_id: int,
+        upserted: Iterable[Row | Contact] = (),
+        removed: Iterable[int] = (),
+    ) -> None:
+        """Apply committed contact writes to the user's digest"""
+        upserted = [_as_dict(contact) for contact in upserted]
+        removed = list(removed)
+        if not upserted and not removed:
+            return
+        scores_key, rows_key, day_key, gen_key = self._keys(user_id)
+
+        async def apply(pipe):
+            day = await pipe.get(day_key)
+            pipe.multi()
+            # a no-op update still has to abort a rebuild that read before it
+            pipe.incr(gen_key)
+            pipe.expire(gen_key, self.ttl)
+            if removed:
+                pipe.zrem(scores_key, *removed)
+                pipe.hdel(rows_key, *removed)
+            if upserted and day is not None:
+                start_key = birthday_key(date.fromisoformat(day.decode()))
+                self._write(pipe, scores_key, rows_key, upserted, start_key)
+
+        try:
+            await self.redis.transaction(apply, day_key)
+        except Exception as e:
+            logger.error(f"Birthday digest update error for user {user_id}: {e}")
+            await self.drop(user_id)
+
+    async def drop(self, user_id: int) -> None:
+        """Send reads to the database until the next rebuild"""
+        scores_key, rows_key, day_key, gen_key = self._keys(user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(scores_key, rows_key, day_key)
+                pipe.incr(gen_key)
+                pipe.expire(gen_key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Birthday digest drop error for user {user_id}: {e}")
+
+
+birthday_digest = BirthdayDigest(ttl=settings.BIRTHDAYS_DIGEST_TTL_SECONDS)
+
+
+async def rebuild_birthday_digests() -> None:
+    """Precompute today's digest of every user, a daily scheduler job"""
+    today = date.today()
+    rebuilt = failed = 0
+    async with sessionmanager.session() as session:
+        user_ids = await UsersRepository(session).get_user_ids()
+        for user_id in user_ids:
+            # the repository needs the id only
+            repository = ContactsRepository(session, User(id=user_id))
+            if await birthday_digest.rebuild(repository, today):
+                rebuilt += 1
+            else:
+                failed += 1
+    logger.info(f"Birthday digests for {today}: {rebuilt} rebuilt, {failed} failed")
@@ -1,18 +1,104 @@
-from pydantic import EmailStr
+import csv
+
+from fastapi import UploadFile
+from pydantic import EmailStr, ValidationError
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
+from src.database.db import sessionmanager
 from src.entity.models import User
-from src.repositories.contacts import ContactsRepository
-from src.schemas.contacts import ContactsSchema, ContactsUpdateSchema
+from src.repositories.contacts import CONTACT_COLUMNS, ContactsRepository
+from src.services.birthdays import birthday_digest
+from src.services.contacts_cache import contacts_cache
+from src.schemas.contacts import (
+    ContactsSchema,
+    ContactsUpdateSchema,
+    ContactsResponse,
+    ContactsBatchPatch,
+    ContactsBatchResult,
+    ContactsImportError,
+    ContactsImportResponse,
+)
+from src.utils.contacts_io import iter_upload_batches, parse_record, encode_rows
+
+
+def _error_message(error: dict) -> str:
+    loc = ".".join(map(str, error["loc"]))
+    # model level errors, like missing contact channels, have no location
+    return f"{loc}: {error['msg']}" if loc else error["msg"]
 
 
 class ContactsService:
     def __init__(self, db: AsyncSession, user: User):
+        self.user = user
         self.repository = ContactsRepository(db, user)
 
+    async def _changed(self, upserted=(), removed=()) -> None:
+        """Make cached reads of the user stale, call after the commit"""
+        # digest first: a read cached under the new version must see the change
+        await birthday_digest.update(self.user.id, upserted, removed)
+        await contacts_cache.bump(self.user.id)
+
     async def create_contact(self, body: ContactsSchema):
-        return await self.repository.create_contact(body)
+        contact = await self.repository.create_contact(body)
+        await self._changed(upserted=[contact])
+        return contact
+
+    async def import_contacts(
+        self, file: UploadFile, fmt: str
+    ) -> ContactsImportResponse:
+        """Insert the valid records batch by batch and report the rest
+
+        Batches are committed as they go, so a file that turns unreadable
+        midway keeps the batches imported before and reports the break as an
+        error of the first record that was not read.
+        """
+        imported = failed = row = 0
+        errors = []
+        try:
+            async for batch in iter_upload_batches(
+                file, fmt, settings.CONTACTS_IMPORT_BATCH_SIZE
+            ):
+                bodies = []
+                for record in batch:
+                    row += 1
+                    try:
+                        body = ContactsSchema.model_validate(parse_record(record, fmt))
+                    except ValidationError as e:
+                        messages = [_error_message(err) for err in e.errors()]
+                    except ValueError as e:
+                        messages = [str(e)]
+                    else:
+                        bodies.append(body)
+                        continue
+                    failed += 1
+                    if len(errors) < settings.CONTACTS_IMPORT_MAX_ERRORS:
+                        errors.append(ContactsImportError(row=row, errors=messages))
+                imported += await self.repository.create_contacts(bodies)
+        except (csv.Error, UnicodeDecodeError) as e:
+            message = f"Malformed file, this and later records skipped: {e}"
+            errors.append(ContactsImportError(row=row + 1, errors=[message]))
+        finally:
+            if imported:
+                # reads go to the database until the scheduled rebuild, loading
+                # every contact here would defeat the batched import
+                await birthday_digest.drop(self.user.id)
+                await self._changed()
+        return ContactsImportResponse(imported=imported, failed=failed, errors=errors)
+
+    @staticmethod
+    async def export_contacts(user: User, fmt: str):
+        """Stream all contacts of the user encoded as CSV or NDJSON
+
+        Uses its own session: the response body is produced after the
+        request dependencies (and their session) are already closed.
+        """
+        async with sessionmanager.session() as session:
+            repository = ContactsRepository(session, user)
+            fields = [column.key for column in CONTACT_COLUMNS]
+            async for chunk in encode_rows(repository.stream_contacts(), fmt, fields):
+                yield chunk
 
     async def get_contacts(
         self,
@@ -21,21 +107,79 @@ class ContactsService:
         first_name: str = None,
         last_name: str = None,
         email: EmailStr = None,
+        after_id: int = None,
+        replica: bool = True,
     ):
         return await self.repository.get_contacts(
-            limit, offset, first_name, last_name, email
+            limit, offset, first_name, last_name, email, after_id, replica
         )
 
+    async def search_contacts(
+        self, q: str, limit: int, after: tuple[float, int] | None = None
+    ):
+        """Returns the page and the (rank, id) to continue after, if any"""
+        rows = await self.repository.search_contacts(q, limit, after)
+        contacts = [row._asdict() for row in rows]
+        ranks = [contact.pop("rank") for contact in contacts]
+        if len(contacts) < limit:
+            return contacts, None
+        return contacts, (ranks[-1], contacts[-1]["id"])
+
     async def get_contact(self, cnt_id: int):
         return await self.repository.get_contact_by_id(cnt_id)
 
     async def update_contact(self, cnt_id: int, body: ContactsUpdateSchema):
-        return await self.repository.update_contact(cnt_id, body)
+        contact = await self.repository.update_contact(cnt_id, body)
+        if contact is not None:
+            await self._changed(upserted=[contact])
+        return contact
 
     async def remove_contact(self, cnt_id: int):
-        return await self.repository.remove_contact(cnt_id)
+        contact = await self.repository.remove_contact(cnt_id)
+        if contact is not None:
+            await self._changed(removed=[contact.id])
+        return contact
 
-    async def get_contacts_upcoming_birthdays(self, days: int, limit: int, offset: int):
+    async def get_contacts_upcoming_birthdays(
+        self, days: int, limit: int, offset: int, replica: bool = True
+    ):
+        contacts = await birthday_digest.read(self.user.id, days, limit, offset)
+        if contacts is not None:
+            return contacts
         return await self.repository.get_contacts_upcoming_birthdays(
-            days, limit, offset
+            days, limit, offset, replica
+        )
+
+    @staticmethod
+    def _batch_results(ids: list[int], found: dict) -> list[ContactsBatchResult]:
+        """One result per requested id, in request order, duplicates dropped"""
+        return [
+            ContactsBatchResult(
+                id=cnt_id,
+                status="ok" if cnt_id in found else "not_found",
+                contact=(
+                    ContactsResponse.model_validate(found[cnt_id])
+                    if found.get(cnt_id) is not None
+                    else None
+                ),
+            )
+            for cnt_id in dict.fromkeys(ids)
+        ]
+
+    async def get_contacts_batch(self, ids: list[int]):
+        rows = await self.repository.get_contacts_by_ids(ids)
+        return self._batch_results(ids, {row.id: row for row in rows})
+
+    async def update_contacts_batch(self, patches: list[ContactsBatchPatch]):
+        rows = await self.repository.update_contacts(patches)
+        if rows:
+            await self._changed(upserted=rows)
+        return self._batch_results(
+            [patch.id for patch in patches], {row.id: row for row in rows}
         )
+
+    async def remove_contacts_batch(self, ids: list[int]):
+        removed = await self.repository.remove_contacts(ids)
+        if removed:
+            await self._changed(removed=removed)
+        return self._batch_results(ids, dict.fromkeys(removed))
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.utils.lru import LRUCache
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ContactsCache:
+    """Cached JSON responses of contacts reads, per user
+
+    Keys embed the user's version counter. Contact writes bump the counter,
+    so entries of older versions become unreachable and simply expire.
+    """
+
+    def __init__(self, ttl: int, local_ttl: float, local_maxsize: int):
+        self.ttl = ttl
+        self._local = LRUCache(maxsize=local_maxsize, ttl=local_ttl)
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"contacts:ver:{user_id}"
+
+    async def version(self, user_id: int) -> int | None:
+        """Current version of user's contacts, None when Redis is unavailable"""
+        try:
+            return int(await self.redis.get(self.version_key(user_id)) or 0)
+        except Exception as e:
+            logger.error(f"Contacts cache version error: {e}")
+            return None
+
+    async def bump(self, user_id: int) -> None:
+        try:
+            await self.redis.incr(self.version_key(user_id))
+        except Exception as e:
+            logger.error(f"Contacts cache bump error: {e}")
+
+    @staticmethod
+    def key(user_id: int, version: int, name: str, params: dict) -> str:
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"contacts:cache:{user_id}:{version}:{name}:{digest}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        # the key fully determines the body, so it is a strong validator
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    async def get(self, key: str) -> tuple[bytes, dict] | None:
+        """Cached (body, headers) of the response"""
+        entry = self._local.get(key)
+        if entry is None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                logger.error(f"Contacts cache read error: {e}")
+                return None
+            if raw is None:
+                return None
+            headers, body = raw.split(b"\n", 1)
+            entry = (body, json.loads(headers))
+            self._local.set(key, entry)
+        return entry
+
+    async def set(self, key: str, body: bytes, headers: dict) -> None:
+        self._local.set(key, (body, headers))
+        try:
+            await self.redis.setex(
+                key, self.ttl, json.dumps(headers).encode() + b"\n" + body
+            )
+        except Exception as e:
+            logger.error(f"Contacts cache write error: {e}")
+
+
+contacts_cache = ContactsCache(
+    ttl=settings.CONTACTS_CACHE_TTL_SECONDS,
+    local_ttl=settings.CONTACTS_CACHE_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.CONTACTS_CACHE_LOCAL_MAXSIZE,
+)
@@ -1,45 +1,95 @@
 import logging
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pydantic import EmailStr
 
 from src.conf.config import settings
-from src.utils.email_tokens import create_email_token
+from src.database.redis import get_redis_client
+from src.utils.email_tokens import get_email_token
 
 logger = logging.getLogger("uvicorn.error")
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+MAIL_STREAM = "mail:outbox"
+
+# templates never change at runtime: compile once, skip reload checks
+templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=select_autoescape(),
+    auto_reload=False,
 )
+confirm_email_template = templates.get_template("confirm_email.html")
 
 
 async def send_email(email: EmailStr, username: str, host: str):
+    """Queue a confirmation email, it is delivered by the mail worker"""
     try:
-        token_verification = create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
+        await get_redis_client().xadd(
+            MAIL_STREAM,
+            {"email": str(email), "username": username, "host": host, "attempts": 0},
+            maxlen=settings.MAIL_QUEUE_MAXLEN,
+            approximate=True,
         )
+    except Exception as e:
+        logger.error(f"Can't queue email to {email}: {e}")
+
+
+def render_confirm_email(
+    email: str, username: str, host: str, token: str
+) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = "Confirm your email"
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = email
+    message.set_content(
+        confirm_email_template.render(host=host, username=username, token=token),
+        subtype="html",
+    )
+    return message
+
+
+async def build_confirm_email(email: str, username: str, host: str) -> EmailMessage:
+    token_verification = await get_email_token(email)
+    return render_confirm_email(email, username, host, token_verification)
+
+
+class SMTPSender:
+    """Keeps one SMTP connection open and reuses it for consecutive messages"""
+
+    def __init__(self):
+        self._smtp: aiosmtplib.SMTP | None = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            use_tls=settings.MAIL_SSL_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            validate_certs=settings.VALIDATE_CERTS,
+            timeout=settings.MAIL_TIMEOUT,
+        )
+        await smtp.connect()
+        if settings.USE_CREDENTIALS:
+            await smtp.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+        return smtp
+
+    async def send(self, message: EmailMessage) -> None:
+        if self._smtp is None or not self._smtp.is_connected:
+            self._smtp = await self._connect()
+        try:
+            await self._smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # server dropped the idle connection, one more try on a fresh one
+            self._smtp = await self._connect()
+            await self._smtp.send_message(message)
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="confirm_email.html")
-    except ConnectionErrors as err:
-        logger.error(err)
+    async def close(self) -> None:
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException as e:
+                logger.warning(f"SMTP quit error: {e}")
+        self._smtp = None
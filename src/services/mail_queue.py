@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import time
+
+from redis.exceptions import ResponseError
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.services.email import MAIL_STREAM, SMTPSender, build_confirm_email
+
+logger = logging.getLogger("uvicorn.error")
+
+MAIL_GROUP = "mailers"
+MAIL_RETRY = "mail:retry"
+MAIL_DEAD = "mail:dead"
+
+
+class MailWorker:
+    """Delivers queued emails from the Redis stream over a reused SMTP connection
+
+    Failed messages are rescheduled with exponential backoff through a sorted
+    set and end in the dead letter stream after MAIL_MAX_ATTEMPTS. Entries of
+    a crashed worker are claimed back once they have been idle long enough.
+    """
+
+    def __init__(self, consumer: str):
+        self.consumer = consumer
+        self.redis = get_redis_client()
+        self.sender = SMTPSender()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(
+                MAIL_STREAM, MAIL_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _requeue_due(self) -> None:
+        due = await self.redis.zrangebyscore(
+            MAIL_RETRY, "-inf", time.time(), start=0, num=settings.MAIL_BATCH_SIZE
+        )
+        for member in due:
+            # only the worker which removed the entry puts it back
+            if await self.redis.zrem(MAIL_RETRY, member):
+                await self.redis.xadd(MAIL_STREAM, json.loads(member))
+
+    async def _fail(self, fields: dict, error: Exception) -> None:
+        attempts = int(fields.get("attempts", 0)) + 1
+        fields = {**fields, "attempts": attempts, "error": str(error)}
+        if attempts >= settings.MAIL_MAX_ATTEMPTS:
+            logger.error(f"Email to {fields['email']} is dead lettered: {error}")
+            await self.redis.xadd(MAIL_DEAD, fields)
+            return
+        delay = min(
+            settings.MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            settings.MAIL_RETRY_MAX_SECONDS,
+        )
+        logger.warning(f"Email to {fields['email']} failed, retry in {delay}s: {error}")
+        await self.redis.zadd(MAIL_RETRY, {json.dumps(fields): time.time() + delay})
+
+    async def _deliver(self, entries: list) -> None:
+        for entry_id, raw_fields in entries:
+            fields = {key.decode(): value.decode() for key, value in raw_fields.items()}
+            try:
+                message = await build_confirm_email(
+                    fields["email"], fields["username"], fields["host"]
+                )
+                await self.sender.send(message)
+            except Exception as e:
+                await self._fail(fields, e)
+            # one by one: a crash later in the batch must not resend this one,
+            # and an entry whose _fail raised stays pending to be claimed again
+            await self.redis.xack(MAIL_STREAM, MAIL_GROUP, entry_id)
+
+    async def _read(self) -> list:
+        # pending entries of dead consumers first
+        claimed = await self.redis.xautoclaim(
+            MAIL_STREAM,
+            MAIL_GROUP,
+            self.consumer,
+            min_idle_time=settings.MAIL_CLAIM_IDLE_SECONDS * 1000,
+            start_id="0-0",
+            count=settings.MAIL_BATCH_SIZE,
+        )
+        if claimed[1]:
+            return claimed[1]
+        response = await self.redis.xreadgroup(
+            MAIL_GROUP,
+            self.consumer,
+            {MAIL_STREAM: ">"},
+            count=settings.MAIL_BATCH_SIZE,
+            block=1000,
+        )
+        return response[0][1] if response else []
+
+    async def run(self) -> None:
+        await self._ensure_group()
+        logger.info(f"Mail worker {self.consumer} started")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self._requeue_due()
+                    entries = await self._read()
+                    if entries:
+                        await self._deliver(entries)
+                    else:
+                        # don't keep an idle SMTP session open
+                        await self.sender.close()
+                except Exception as e:
+                    logger.error(f"Mail worker error: {e}", exc_info=True)
+                    await asyncio.sleep(1)
+        finally:
+            await self.sender.close()
+            logger.info(f"Mail worker {self.consumer} stopped")
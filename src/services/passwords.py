@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from src.conf.config import settings
+from src.utils.metrics import Histogram
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed_password: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed_password)
+
+
+def hash_rounds(hashed_password: str) -> int:
+    """Cost factor of a bcrypt hash like $2b$12$..."""
+    return int(hashed_password.split("$")[2])
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread or process pool, off the event loop"""
+
+    def __init__(self, executor: str, workers: int, max_queue: int, rounds: int):
+        self.executor = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.rejected = 0
+        self.duration = Histogram()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+            )
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.duration.observe(time.perf_counter() - started)
+            self.running -= 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        hashed_password = await self._run(_hashpw, password.encode(), self.rounds)
+        return hashed_password.decode()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            _checkpw, plain_password.encode(), hashed_password.encode()
+        )
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return hash_rounds(hashed_password) != self.rounds
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor,
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "rejected": self.rejected,
+            "duration_seconds": self.duration.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
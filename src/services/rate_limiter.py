@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+
+from limits import RateLimitItem
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.utils.lru import LRUCache
+
+logger = logging.getLogger("uvicorn.error")
+
+KEY_PREFIX = "rl:"
+
+# GCRA: the key holds the theoretical arrival time (TAT) in ms of Redis clock
+GCRA_SCRIPT = """
+local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now)
+local new_tat = tat + interval
+if new_tat - now > period then
+    return math.max(math.ceil(new_tat - period - now), 1)
+end
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+return 0
+"""
+
+
+def _consume(task: asyncio.Future) -> None:
+    # the result of a timed out call is of no use, just don't warn about it
+    if not task.cancelled():
+        task.exception()
+
+
+class RateLimiter:
+    """GCRA rate limits shared by all workers through one Lua call to Redis
+
+    A call slower than the timeout is left to finish in the background and the
+    request is checked against the in-process limiter instead; Redis is then
+    skipped for retry_seconds. The local limits are per worker. A timed out
+    call still counts in Redis, so its request is checked locally but counted
+    there only when Redis failed.
+    """
+
+    def __init__(self, timeout: float, retry_seconds: float, local_maxsize: int):
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._local = LRUCache(maxsize=local_maxsize, ttl=0)
+        self._script = None
+        self._down_until = 0.0
+        self.fallbacks = 0
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    def _gcra(self):
+        client = self.redis
+        if self._script is None or self._script.registered_client is not client:
+            self._script = client.register_script(GCRA_SCRIPT)
+        return self._script
+
+    async def load(self) -> None:
+        """Load the script on startup, so the first hit isn't a NOSCRIPT retry"""
+        await self.redis.script_load(GCRA_SCRIPT)
+
+    def _local_hit(
+        self, key: str, interval: float, period: float, count: bool = True
+    ) -> float:
+        now = time.monotonic()
+        tat = max(self._local.get(key, now), now)
+        new_tat = tat + interval
+        if new_tat - now > period:
+            return new_tat - period - now
+        if count:
+            self._local.set(key, new_tat, ttl=new_tat - now)
+        return 0
+
+    async def hit(self, key: str, limit: RateLimitItem) -> float:
+        """Count a request, returns seconds to wait when the limit is exceeded"""
+        period = limit.get_expiry()
+        interval = period / limit.amount
+        counted = False
+        if time.monotonic() >= self._down_until:
+            call = asyncio.ensure_future(
+                self._gcra()(
+                    keys=[f"{KEY_PREFIX}{key}"],
+                    args=[round(interval * 1000, 3), period * 1000],
+                )
+            )
+            try:
+                # shielded, a cancelled call would drop its connection
+                retry_after = await asyncio.wait_for(asyncio.shield(call), self.timeout)
+                return retry_after / 1000
+            except asyncio.TimeoutError:
+                call.add_done_callback(_consume)
+                counted = True
+            except Exception as e:
+                logger.error(f"Rate limiter Redis error: {e}")
+            self._down_until = time.monotonic() + self.retry_seconds
+            self.fallbacks += 1
+        return self._local_hit(key, interval, period, count=not counted)
+
+
+rate_limiter = RateLimiter(
+    timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+    retry_seconds=settings.RATE_LIMIT_REDIS_RETRY_SECONDS,
+    local_maxsize=settings.RATE_LIMIT_LOCAL_MAXSIZE,
+)
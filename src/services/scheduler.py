@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time as clock
+
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable
+
+from src.database.redis import get_redis_client
+
+logger = logging.getLogger("uvicorn.error")
+
+Job = Callable[[], Awaitable[None]]
+
+
+class Scheduler:
+    """Runs jobs periodically, every few seconds or daily at a given time
+
+    Every run takes a Redis lock named after its slot, so when several
+    schedulers are started a job still runs once per slot.
+    """
+
+    def __init__(self):
+        self._loops: list[Callable[[], Awaitable[None]]] = []
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def every(self, seconds: float, job: Job, name: str | None = None) -> None:
+        name = name or job.__name__
+
+        def next_slot() -> tuple[str, float]:
+            slot = int(clock.time() // seconds) + 1
+            return str(slot), slot * seconds - clock.time()
+
+        self._loops.append(lambda: self._loop(name, job, next_slot, seconds))
+
+    def daily(
+        self, at: time, job: Job, name: str | None = None, catch_up: bool = True
+    ) -> None:
+        """Run at the time of the day, with catch_up also at once on start"""
+        name = name or job.__name__
+        catching_up = catch_up
+
+        def next_slot() -> tuple[str, float]:
+            nonlocal catching_up
+            now = datetime.now()
+            run_at = datetime.combine(now.date(), at)
+            # a missed run of today happens at once, still once thanks to the lock
+            if run_at <= now and not catching_up:
+                run_at += timedelta(days=1)
+            catching_up = False
+            return run_at.date().isoformat(), max((run_at - now).total_seconds(), 0)
+
+        self._loops.append(lambda: self._loop(name, job, next_slot, 24 * 3600))
+
+    async def _acquire(self, name: str, slot: str, ttl: float) -> bool:
+        try:
+            return bool(
+                await get_redis_client().set(
+                    f"scheduler:{name}:{slot}", 1, nx=True, ex=int(ttl) + 1
+                )
+            )
+        except Exception as e:
+            # better twice than never
+            logger.error(f"Scheduler lock error for {name}: {e}")
+            return True
+
+    async def _loop(self, name: str, job: Job, next_slot, ttl: float) -> None:
+        while not self._stopping.is_set():
+            slot, delay = next_slot()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if not await self._acquire(name, slot, ttl):
+                logger.debug(f"Job {name} of {slot} is run by another scheduler")
+                continue
+            started = clock.perf_counter()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Job {name} failed: {e}", exc_info=True)
+            else:
+                elapsed = clock.perf_counter() - started
+                logger.info(f"Job {name} of {slot} done in {elapsed:.1f}s")
+
+    async def run(self) -> None:
+        logger.info(f"Scheduler started with {len(self._loops)} jobs")
+        await asyncio.gather(*(loop() for loop in self._loops))
+        logger.info("Scheduler stopped")
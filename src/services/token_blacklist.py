@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.utils.bloom import BloomFilter
+
+logger = logging.getLogger("uvicorn.error")
+
+KEY_PREFIX = "bl:"
+CHANNEL = "bl-events"
+
+
+class TokenBlacklist:
+    """Revoked token ids in Redis, mirrored into a local bloom filter
+
+    Every worker feeds its filter from a pub/sub channel and rebuilds it from
+    Redis periodically, since a bloom filter can't forget expired entries.
+    A miss in the filter means "not revoked" without a Redis call; until the
+    subscription is up every check goes to Redis.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, rebuild_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self._synced = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    async def revoke(self, token_id: str, ttl: int) -> None:
+        await self.redis.setex(f"{KEY_PREFIX}{token_id}", ttl, "1")
+        self._filter.add(token_id)
+        await self.redis.publish(CHANNEL, token_id)
+
+    async def is_revoked(self, token_id: str) -> bool:
+        if self._synced and token_id not in self._filter:
+            return False
+        return bool(await self.redis.exists(f"{KEY_PREFIX}{token_id}"))
+
+    async def _load(self) -> BloomFilter:
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        async for key in self.redis.scan_iter(match=f"{KEY_PREFIX}*", count=1000):
+            bloom.add(key.decode()[len(KEY_PREFIX) :])
+        return bloom
+
+    async def _sync(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                # subscribe before loading, so nothing revoked meanwhile is lost
+                await pubsub.subscribe(CHANNEL)
+                self._filter = await self._load()
+                self._synced = True
+                rebuild_at = time.monotonic() + self.rebuild_seconds
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        self._filter.add(message["data"].decode())
+                    if time.monotonic() >= rebuild_at:
+                        self._filter = await self._load()
+                        rebuild_at = time.monotonic() + self.rebuild_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token blacklist sync error: {e}")
+                self._synced = False
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._synced = False
+
+
+token_blacklist = TokenBlacklist(
+    capacity=settings.BLACKLIST_BLOOM_CAPACITY,
+    error_rate=settings.BLACKLIST_BLOOM_ERROR_RATE,
+    rebuild_seconds=settings.BLACKLIST_REBUILD_SECONDS,
+)
@@ -1,25 +1,94 @@
+import hashlib
+import io
+import time
+from pathlib import Path
+from typing import Protocol
+
 import cloudinary
 import cloudinary.uploader
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
 
 from src.conf.config import settings
 
-class UploadFileService:
+AVATAR_SIZE = (250, 250)
+
+
+class AvatarStorage(Protocol):
+    def save(self, data: bytes, username: str) -> str:
+        """Store the avatar JPEG, returns its public URL (blocking call)"""
+        ...
+
+
+class CloudinaryStorage:
     def __init__(self):
-        self.cloud_name = settings.CLOUDINARY_NAME
-        self.api_key = settings.CLOUDINARY_API_KEY
-        self.api_secret = settings.CLOUDINARY_API_SECRET
         cloudinary.config(
-            cloud_name=self.cloud_name,
-            api_key=self.api_key,
-            api_secret=self.api_secret,
+            cloud_name=settings.CLOUDINARY_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
             secure=True,
         )
 
-    @staticmethod
-    def upload_file(file, username) -> str:
+    def save(self, data: bytes, username: str) -> str:
         public_id = f"RestApp/{username}"
-        r = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-        src_url = cloudinary.CloudinaryImage(public_id).build_url(
-            width=250, height=250, crop="fill", version=r.get("version")
+        r = cloudinary.uploader.upload(
+            io.BytesIO(data), public_id=public_id, overwrite=True
         )
-        return src_url
+        return cloudinary.CloudinaryImage(public_id).build_url(version=r.get("version"))
+
+
+class LocalStorage:
+    """Filesystem stand-in for Cloudinary, e.g. for tests and local runs"""
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, data: bytes, username: str) -> str:
+        name = f"{hashlib.sha256(username.encode()).hexdigest()[:32]}.jpg"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / name).write_bytes(data)
+        return f"{self.base_url}/{name}?v={int(time.time())}"
+
+
+_storage: AvatarStorage | None = None
+
+
+def get_avatar_storage() -> AvatarStorage:
+    global _storage
+    if _storage is None:
+        if settings.AVATAR_STORAGE == "local":
+            _storage = LocalStorage(
+                settings.AVATAR_LOCAL_DIR, settings.AVATAR_LOCAL_URL
+            )
+        else:
+            _storage = CloudinaryStorage()
+    return _storage
+
+
+class UploadFileService:
+    def __init__(self, storage: AvatarStorage | None = None):
+        self.storage = storage or get_avatar_storage()
+
+    @staticmethod
+    def _resize(data: bytes) -> bytes:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                # let JPEG decoder downscale while decoding
+                image.draft("RGB", AVATAR_SIZE)
+                image = ImageOps.exif_transpose(image)
+                avatar = ImageOps.fit(image.convert("RGB"), AVATAR_SIZE)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Unsupported image",
+            )
+        output = io.BytesIO()
+        avatar.save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue()
+
+    async def upload_file(self, file: UploadFile, username: str) -> str:
+        data = await file.read()
+        avatar = await run_in_threadpool(self._resize, data)
+        return await run_in_threadpool(self.storage.save, avatar, username)
@@ -1,9 +1,16 @@
+import logging
+
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from src.entity.models import User
+from src.database.db import sessionmanager
+from src.entity.models import User, UserRole
 from src.repositories.users import UsersRepository
 from src.schemas.user import UserCreate
 from src.services.auth import AuthService
+from src.utils.gravatar import gravatar_url, gravatar_exists
+
+logger = logging.getLogger("uvicorn.error")
 
 
 class UsersService:
@@ -30,3 +37,24 @@ class UsersService:
 
     async def update_avatar_url(self, email: str, url: str):
         return await self.users_repository.update_avatar_url(email, url)
+
+    async def update_role(self, email: str, role: UserRole):
+        return await self.users_repository.update_role(email, role)
+
+
+async def verify_gravatar(email: str) -> None:
+    """Background job: fall back to an identicon when the email has no Gravatar"""
+    try:
+        exists = await run_in_threadpool(gravatar_exists, email)
+    except Exception as e:
+        logger.warning(f"Gravatar check for {email} failed: {e}")
+        return
+    if exists:
+        return
+
+    async with sessionmanager.session() as session:
+        repository = UsersRepository(session)
+        user = await repository.get_user_by_email(email, replica=False)
+        # keep avatars which were changed in the meantime
+        if user is not None and user.avatar == gravatar_url(email):
+            await repository.update_avatar_url(email, gravatar_url(email, "identicon"))
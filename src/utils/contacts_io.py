@@ -0,0 +1,73 @@
+import codecs
+import csv
+import io
+import json
+from datetime import date
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Sequence
+
+from sqlalchemy import Row
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+CONTACTS_FORMATS_PATTERN = "^(csv|ndjson)$"
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _iter_records(text: Iterable[str], fmt: str) -> Iterator[dict | str]:
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+    else:
+        for line in text:
+            if line.strip():
+                yield line
+
+
+def parse_record(record: dict | str, fmt: str) -> dict:
+    """Turn a raw CSV row or NDJSON line into a dict for ContactsSchema"""
+    if fmt == "csv":
+        # empty CSV cells mean "not set"; extra unnamed cells are dropped
+        return {k: v or None for k, v in record.items() if k is not None}
+    data = json.loads(record)
+    if not isinstance(data, dict):
+        raise ValueError("Record must be a JSON object")
+    return data
+
+
+async def iter_upload_batches(
+    file: UploadFile, fmt: str, batch_size: int
+) -> AsyncIterator[list[dict | str]]:
+    """Read records of the uploaded file in batches, file IO runs off the loop"""
+    await file.seek(0)
+    # line by line over the binary file: TextIOWrapper needs readable() of
+    # SpooledTemporaryFile, which Python 3.10 lacks
+    records = _iter_records(codecs.iterdecode(file.file, "utf-8-sig"), fmt)
+    while batch := await run_in_threadpool(lambda: list(islice(records, batch_size))):
+        yield batch
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Type {type(value)} is not JSON serializable")
+
+
+async def encode_rows(
+    chunks: AsyncIterator[Sequence[Row]], fmt: str, fields: Sequence[str]
+) -> AsyncIterator[str]:
+    """Encode chunks of rows as CSV (with header) or NDJSON text"""
+    if fmt == "csv":
+        # up front, so an export without contacts still has its header
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(fields)
+        yield buffer.getvalue()
+    async for rows in chunks:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(row._asdict(), default=_json_default) + "\n" for row in rows
+            )
@@ -0,0 +1,25 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values) -> str:
+    """Pack keyset values into an opaque url-safe cursor"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """Unpack a cursor made by encode_cursor, values are coerced to types"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Wrong cursor size")
+        return [type_(value) for type_, value in zip(types, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Incorrect pagination cursor",
+        )
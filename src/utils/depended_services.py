@@ -1,9 +1,13 @@
-from fastapi import Depends, HTTPException
+import math
+
+from fastapi import Depends, HTTPException, Request, status
+from limits import parse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
+from src.database.db import get_db, LazySession
 from src.entity.models import User, UserRole
 from src.services.auth import AuthService, oauth2_scheme
+from src.services.rate_limiter import rate_limiter
 from src.services.users import UsersService
 
 
@@ -18,11 +22,45 @@ def get_users_service(db: AsyncSession = Depends(get_db)):
 async def get_authorized_user(
     token: str = Depends(oauth2_scheme),
     auth_service: AuthService = Depends(get_auth_service),
+    db: LazySession = Depends(get_db),
 ):
-    return await auth_service.get_current_user(token)
+    user = await auth_service.get_current_user(token)
+    # don't hold the connection of the user lookup for the rest of the request
+    await db.release()
+    return user
 
 
 def get_admin_user(current_user: User = Depends(get_authorized_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Insufficient access rights")
     return current_user
+
+
+async def _check_rate_limit(name: str, key: str, limit) -> None:
+    retry_after = await rate_limiter.hit(f"{name}:{key}", limit)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: {limit}",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def limit_by_user(name: str, limit: str):
+    """Route dependency limiting requests of each authorized user"""
+    rate = parse(limit)
+
+    async def check(user: User = Depends(get_authorized_user)):
+        await _check_rate_limit(name, f"user:{user.id}", rate)
+
+    return Depends(check)
+
+
+def limit_by_ip(name: str, limit: str):
+    """Route dependency limiting requests from each client address"""
+    rate = parse(limit)
+
+    async def check(request: Request):
+        await _check_rate_limit(name, f"ip:{request.client.host}", rate)
+
+    return Depends(check)
@@ -4,6 +4,15 @@ import jwt
 from fastapi import HTTPException, status
 
 from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.utils.lru import LRUCache
+
+# tokens are handed out again until this close to their expiry
+TOKEN_REUSE_SECONDS = (
+    settings.EMAIL_TOKEN_EXPIRE_DAYS * 86400
+    - settings.EMAIL_TOKEN_REUSE_MARGIN_HOURS * 3600
+)
+_local_tokens = LRUCache(maxsize=10_000, ttl=min(3600, TOKEN_REUSE_SECONDS))
 
 
 def create_email_token(data: dict):
@@ -16,6 +25,26 @@ def create_email_token(data: dict):
     return token
 
 
+async def get_email_token(email: str) -> str:
+    """Confirmation token of the email, memoized until it is close to expiry"""
+    token = _local_tokens.get(email)
+    if token is not None:
+        return token
+
+    redis = get_redis_client()
+    key = f"mail:token:{email}"
+    cached = await redis.get(key)
+    if cached is not None:
+        token = cached.decode()
+    else:
+        token = create_email_token({"sub": email})
+        # first writer wins, so concurrent workers hand out the same token
+        if not await redis.set(key, token, ex=TOKEN_REUSE_SECONDS, nx=True):
+            token = (await redis.get(key) or token.encode()).decode()
+    _local_tokens.set(email, token)
+    return token
+
+
 def get_email_from_token(token: str):
     try:
         payload = jwt.decode(
@@ -0,0 +1,25 @@
+import hashlib
+from functools import lru_cache
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+GRAVATAR_URL = "https://www.gravatar.com/avatar/"
+
+
+@lru_cache(maxsize=4096)
+def gravatar_url(email: str, default: str = "") -> str:
+    """Gravatar image URL, a pure function of the email"""
+    digest = hashlib.md5(email.strip().lower().encode()).hexdigest()
+    return f"{GRAVATAR_URL}{digest}" + (f"?d={default}" if default else "")
+
+
+def gravatar_exists(email: str, timeout: float = 5) -> bool:
+    """Ask Gravatar whether the email has an image (blocking network call)"""
+    request = Request(gravatar_url(email, default="404"), method="HEAD")
+    try:
+        with urlopen(request, timeout=timeout):
+            return True
+    except HTTPError as e:
+        if e.code == 404:
+            return False
+        raise
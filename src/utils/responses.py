@@ -0,0 +1,16 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+from src.utils.timing import SERIALIZE, Span
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core, ready bytes are sent as is"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        with Span(SERIALIZE):
+            return pydantic_core.to_json(content)
@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+from src.conf.config import settings
+from src.database.redis import get_redis_client
+from src.utils.metrics import DEFAULT_BUCKETS, Histogram
+
+logger = logging.getLogger("uvicorn.error")
+
+METRIC = "http_request_stage_seconds"
+METRICS_KEY = "metrics:stages"
+TOTAL = "total"
+SERIALIZE = "serialize"
+
+# seconds per stage of the request being served, and the stages open now
+_timing: ContextVar[tuple[dict[str, float], dict[str, int]] | None] = ContextVar(
+    "timing", default=None
+)
+
+
+class Span:
+    """Add the time of a block to a stage of the current request
+
+    Only the outermost span of a stage counts, so a query called from another
+    one isn't counted twice. Different stages may nest (auth includes its db
+    queries). Outside of a request the span does nothing.
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        timing = _timing.get()
+        if timing is not None:
+            depth = timing[1]
+            depth[self.stage] = depth.get(self.stage, 0) + 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        timing = _timing.get()
+        if timing is None:
+            return
+        stages, depth = timing
+        depth[self.stage] -= 1
+        if not depth[self.stage]:
+            elapsed = time.perf_counter() - self.started
+            stages[self.stage] = stages.get(self.stage, 0.0) + elapsed
+
+
+def timed(stage: str):
+    """Decorator timing a coroutine method as a span of the stage"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with Span(stage):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _TimedResponseField:
+    """Response model field whose validation and serialization are timed"""
+
+    def __init__(self, field):
+        self._field = field
+
+    def __getattr__(self, name):
+        return getattr(self._field, name)
+
+    def validate(self, *args, **kwargs):
+        with Span(SERIALIZE):
+            return self._field.validate(*args, **kwargs)
+
+    def serialize(self, *args, **kwargs):
+        with Span(SERIALIZE):
+            return self._field.serialize(*args, **kwargs)
+
+
+class TimedRoute(APIRoute):
+    """Route class adding response_model validation to the serialize stage"""
+
+    def get_route_handler(self):
+        field = self.secure_cloned_response_field
+        if field is not None and not isinstance(field, _TimedResponseField):
+            self.secure_cloned_response_field = _TimedResponseField(field)
+        return super().get_route_handler()
+
+
+class TimingMetrics:
+    """Histograms of stage times per method, route and stage, for all workers
+
+    Each worker observes into local histograms and periodically adds them to
+    one Redis hash, so whichever worker serves a scrape renders the totals of
+    the whole server. Fields are JSON [method, route, stage, part], part being
+    an upper bound of a bucket (not cumulative), "sum" or "count".
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._pending: dict[tuple[str, str, str], Histogram] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def redis(self):
+        return get_redis_client()
+
+    def observe(self, method: str, route: str, stages: dict[str, float]) -> None:
+        for stage, seconds in stages.items():
+            histogram = self._pending.get((method, route, stage))
+            if histogram is None:
+                histogram = self._pending[(method, route, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    async def flush(self) -> None:
+        """Add what was observed since the last flush to the shared totals"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for labels, histogram in pending.items():
+                    bounds = [*map(str, histogram.buckets), "+Inf"]
+                    for bound, count in zip(bounds, histogram.counts):
+                        if count:
+                            pipe.hincrby(
+                                METRICS_KEY, json.dumps([*labels, bound]), count
+                            )
+                    pipe.hincrbyfloat(
+                        METRICS_KEY, json.dumps([*labels, "sum"]), histogram.sum
+                    )
+                    pipe.hincrby(
+                        METRICS_KEY, json.dumps([*labels, "count"]), histogram.count
+                    )
+                await pipe.execute()
+        except BaseException:
+            # kept for the next flush
+            for labels, histogram in pending.items():
+                self._pending.setdefault(labels, Histogram()).merge(histogram)
+            raise
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Timing metrics flush error: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Timing metrics flush error: {e}")
+
+    async def render(self) -> str:
+        """Prometheus text exposition format of the shared totals"""
+        await self.flush()
+        fields = await self.redis.hgetall(METRICS_KEY)
+        histograms: dict[tuple[str, str, str], dict[str, float]] = {}
+        for field, value in fields.items():
+            *labels, part = json.loads(field)
+            histograms.setdefault(tuple(labels), {})[part] = float(value)
+
+        lines = [
+            f"# HELP {METRIC} Time spent serving requests, per route and stage",
+            f"# TYPE {METRIC} histogram",
+        ]
+        bounds = [*map(str, DEFAULT_BUCKETS), "+Inf"]
+        for (method, route, stage), parts in sorted(histograms.items()):
+            labels = f'method="{method}",route="{route}",stage="{stage}"'
+            cumulative = 0
+            for bound in bounds:
+                cumulative += int(parts.get(bound, 0))
+                lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{METRIC}_sum{{{labels}}} {parts.get('sum', 0.0)}")
+            lines.append(f"{METRIC}_count{{{labels}}} {int(parts.get('count', 0))}")
+        return "\n".join(lines) + "\n"
+
+
+timing_metrics = TimingMetrics(flush_seconds=settings.METRICS_FLUSH_SECONDS)
+
+
+class TimingMiddleware:
+    """Times requests, reports their stages in Server-Timing and histograms
+
+    A plain ASGI middleware: the response passes through untouched except
+    for the added header.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stages: dict[str, float] = {}
+        token = _timing.set((stages, {}))
+
+        async def send_timed(message):
+            kind = message["type"]
+            if kind == "http.response.start" and self.server_timing:
+                stages[TOTAL] = time.perf_counter() - started
+                header = ", ".join(
+                    f"{stage};dur={seconds * 1000:.1f}"
+                    for stage, seconds in stages.items()
+                )
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", header.encode()),
+                ]
+            elif kind == "http.response.body" and not message.get("more_body"):
+                # background tasks run after this, they don't count
+                stages[TOTAL] = time.perf_counter() - started
+                route = scope.get("route")
+                timing_metrics.observe(
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    dict(stages),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _timing.reset(token)
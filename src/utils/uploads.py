@@ -0,0 +1,44 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload is larger than {max_bytes} bytes",
+    )
+
+
+async def _limited(stream: AsyncIterator[bytes], max_bytes: int):
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large(max_bytes)
+        yield chunk
+
+
+async def receive_upload(request: Request, field: str, max_bytes: int) -> UploadFile:
+    """Parse a single file multipart body, aborting as soon as it gets too big"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _too_large(max_bytes)
+
+    parser = MultiPartParser(
+        request.headers, _limited(request.stream(), max_bytes), max_files=1
+    )
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+    file = form.get(field)
+    if not isinstance(file, UploadFile):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Field '{field}' must be a file",
+        )
+    return file